@@ -0,0 +1,320 @@
+import threading
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion
+from semantic_kernel.contents import ChatMessageContent, FunctionCallContent
+from semantic_kernel.filters import FilterTypes, FunctionInvocationContext
+
+# Histograms keep 2**PRECISION_BITS linear sub-buckets per power of two, i.e. about 3% relative error
+PRECISION_BITS = 5
+_SUB_BUCKETS = 1 << PRECISION_BITS
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - PRECISION_BITS - 1
+    return shift * _SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    """Midpoint of the value range covered by a bucket."""
+    if index < _SUB_BUCKETS:
+        return index
+    shift = index // _SUB_BUCKETS - 1
+    mantissa = index - shift * _SUB_BUCKETS
+    return (mantissa << shift) + ((1 << shift) >> 1)
+
+
+class Histogram:
+    """HDR-style log-linear histogram of durations in microseconds.
+
+    Recording is O(1) and memory only grows with the number of distinct buckets hit, so a
+    histogram can sit on the hot path of every turn for the lifetime of a server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, micros: int):
+        micros = max(int(micros), 0)
+        index = _bucket_index(micros)
+        with self._lock:
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+            if not self.count or micros < self.min:
+                self.min = micros
+            if micros > self.max:
+                self.max = micros
+            self.count += 1
+            self.total += micros
+
+    def percentile(self, quantile: float) -> int:
+        with self._lock:
+            if not self.count:
+                return 0
+            rank = max(1, round(quantile * self.count))
+            seen = 0
+            for index in sorted(self._buckets):
+                seen += self._buckets[index]
+                if seen >= rank:
+                    return min(max(_bucket_value(index), self.min), self.max)
+            return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        summary = {
+            "count": self.count,
+            "sum_us": self.total,
+            "min_us": self.min,
+            "max_us": self.max,
+            "mean_us": self.total / self.count if self.count else 0,
+        }
+        for quantile in QUANTILES:
+            summary[f"p{quantile * 100:g}_us"] = self.percentile(quantile)
+        return summary
+
+
+class _Timer:
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: dict[str, str]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.histogram(self.name, **self.labels).record((time.perf_counter_ns() - self.start) // 1000)
+        if exc_type is not None:
+            self.registry.increment(f"{self.name}.errors", **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """In-process histograms and counters, keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple, Histogram] = {}
+        self._counters: dict[tuple, int] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, str]) -> tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def increment(self, name: str, amount: int = 1, **labels: str):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def timer(self, name: str, **labels: str) -> _Timer:
+        """Context manager that records the duration of its block into the named histogram."""
+        return _Timer(self, name, labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        return {
+            "histograms": [
+                {"name": name, "labels": dict(labels), **histogram.snapshot()}
+                for (name, labels), histogram in sorted(histograms, key=lambda item: item[0])
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters, key=lambda item: item[0])
+            ],
+        }
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format (histograms as summaries)."""
+        snapshot = self.snapshot()
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        for histogram in snapshot["histograms"]:
+            name = _metric_name(histogram["name"]) + "_seconds"
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for quantile in QUANTILES:
+                labels = _render_labels({**histogram["labels"], "quantile": f"{quantile:g}"})
+                lines.append(f"{name}{labels} {histogram[f'p{quantile * 100:g}_us'] / 1e6:.6f}")
+            labels = _render_labels(histogram["labels"])
+            lines.append(f"{name}_sum{labels} {histogram['sum_us'] / 1e6:.6f}")
+            lines.append(f"{name}_count{labels} {histogram['count']}")
+
+        for counter in snapshot["counters"]:
+            name = _metric_name(counter["name"]) + "_total"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_render_labels(counter['labels'])} {counter['value']}")
+
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self) -> str:
+        """Human readable table of the recorded histograms."""
+        rows = [f"{'metric':<40} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for histogram in self.snapshot()["histograms"]:
+            label = histogram["name"]
+            if histogram["labels"]:
+                label += "{" + ",".join(f"{k}={v}" for k, v in histogram["labels"].items()) + "}"
+            rows.append(
+                f"{label:<40} {histogram['count']:>7} {histogram['p50_us'] / 1000:>9.2f} "
+                f"{histogram['p99_us'] / 1000:>9.2f} {histogram['max_us'] / 1000:>9.2f}"
+            )
+        for service, (prompt, cached) in self.prompt_cache().items():
+            rows.append(f"prompt cache{{service={service}}}: {cached}/{prompt} prompt tokens cached ({cached / prompt:.0%})")
+        return "\n".join(rows)
+
+    def prompt_cache(self) -> dict[str, tuple[int, int]]:
+        """Prompt and cached prompt tokens per service, to check the provider's prompt cache hit rate."""
+        tokens: dict[str, list[int]] = {}
+        for counter in self.snapshot()["counters"]:
+            if counter["name"] in ("llm.prompt_tokens", "llm.cached_tokens"):
+                entry = tokens.setdefault(counter["labels"].get("service", ""), [0, 0])
+                entry[counter["name"] == "llm.cached_tokens"] += counter["value"]
+        return {service: (prompt, cached) for service, (prompt, cached) in tokens.items() if prompt}
+
+
+def _metric_name(name: str) -> str:
+    return "agent_" + "".join(char if char.isalnum() else "_" for char in name)
+
+
+def _render_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + rendered + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide registry shared by the plugins, agents and servers
+metrics = MetricsRegistry()
+
+
+class TimedOpenAIChatCompletion(OpenAIChatCompletion):
+    """OpenAIChatCompletion that records the time to first token and the total time of every model request.
+
+    Whole-message requests are streamed internally and the chunks joined back into messages, so
+    the first token can be timed on every path. It also counts prompt, cached and completion
+    tokens, and reuses cached tool schemas instead of serializing every kernel function per request.
+    """
+
+    def _record_usage(self, metadata: dict[str, Any], usage) -> dict[str, Any]:
+        # Semantic Kernel's CompletionUsage drops the prompt tokens served from the provider's cache
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+            metadata["cached_tokens"] = cached
+            metrics.increment("llm.prompt_tokens", usage.prompt_tokens or 0, service=self.service_id)
+            metrics.increment("llm.cached_tokens", cached, service=self.service_id)
+            metrics.increment("llm.completion_tokens", usage.completion_tokens or 0, service=self.service_id)
+        return metadata
+
+    def _get_metadata_from_chat_response(self, response) -> dict[str, Any]:
+        return self._record_usage(super()._get_metadata_from_chat_response(response), response.usage)
+
+    def _get_metadata_from_streaming_chat_response(self, response) -> dict[str, Any]:
+        # Only the last chunk of a stream carries usage
+        return self._record_usage(super()._get_metadata_from_streaming_chat_response(response), response.usage)
+
+    def _update_function_choice_settings_callback(self):
+        from kernel_registry import update_settings_with_cached_tools
+
+        return update_settings_with_cached_tools
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings) -> list[ChatMessageContent]:
+        choices: dict[int, Any] = {}
+        async for messages in self._inner_get_streaming_chat_message_contents(chat_history, settings):
+            for message in messages:
+                joined = choices.get(message.choice_index)
+                choices[message.choice_index] = message if joined is None else joined + message
+        return [
+            ChatMessageContent(
+                role=message.role,
+                items=message.items,
+                name=message.name,
+                inner_content=message.inner_content,
+                ai_model_id=message.ai_model_id,
+                metadata=message.metadata,
+                finish_reason=message.finish_reason,
+            )
+            for _, message in sorted(choices.items())
+        ]
+
+    async def _inner_get_streaming_chat_message_contents(
+        self, chat_history, settings, function_invoke_attempt: int = 0
+    ) -> AsyncGenerator:
+        metrics.increment("llm.requests", service=self.service_id)
+        start = time.perf_counter_ns()
+        waiting = True
+        with metrics.timer("llm.total", service=self.service_id):
+            async for messages in super()._inner_get_streaming_chat_message_contents(
+                chat_history, settings, function_invoke_attempt
+            ):
+                if waiting and any(_has_token(message) for message in messages):
+                    waiting = False
+                    metrics.histogram("llm.first_token", service=self.service_id).record(
+                        (time.perf_counter_ns() - start) // 1000
+                    )
+                yield messages
+
+
+def _has_token(message) -> bool:
+    # The first chunk only carries the role, the first token is the first text or tool call
+    return bool(message.content) or any(isinstance(item, FunctionCallContent) for item in message.items)
+
+
+async def _time_function_invocation(
+    context: FunctionInvocationContext,
+    next: Callable[[FunctionInvocationContext], Awaitable[None]],
+):
+    with metrics.timer("tool.invoke", function=context.function.fully_qualified_name):
+        await next(context)
+
+
+def instrument_kernel(kernel: Kernel) -> Kernel:
+    """Record the duration of every kernel function invocation as `tool.invoke`."""
+    kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, _time_function_invocation)
+    return kernel
+
+
+def metrics_route():
+    """Starlette route serving the registry at /metrics (Prometheus text, or JSON with ?format=json)."""
+    from starlette.responses import JSONResponse, PlainTextResponse
+    from starlette.routing import Route
+
+    async def endpoint(request):
+        if request.query_params.get("format") == "json":
+            return JSONResponse(metrics.snapshot())
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return Route("/metrics", endpoint, methods=["GET"], name="metrics")
@@ -0,0 +1,73 @@
+import asyncio
+import sys
+import threading
+from typing import TextIO
+
+
+class AsyncInput:
+    """Reads lines on a background thread and hands them to the event loop.
+
+    Awaiting a line never blocks the loop, so keep-alives, telemetry export and prefetching keep
+    running while the user thinks. Lines typed (or piped) while a response is still streaming
+    are queued and returned by the following calls in order. When input is not a terminal, for
+    example `python main.py < prompts.txt`, each prompt is echoed with its line so the output
+    reads like a transcript. End of input raises EOFError, like `input()`.
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream = stream or sys.stdin
+        self.interactive = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self._queue: asyncio.Queue[str | None] | None = None
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+        def deliver(line: str | None):
+            try:
+                loop.call_soon_threadsafe(self._queue.put_nowait, line)
+            except RuntimeError:
+                # The loop has already been closed
+                pass
+
+        def read():
+            try:
+                for line in iter(self.stream.readline, ""):
+                    deliver(line.rstrip("\r\n"))
+            finally:
+                deliver(None)
+
+        # A daemon thread, because a blocked read must not keep the process alive at exit
+        threading.Thread(target=read, name="async-input", daemon=True).start()
+
+    @property
+    def queued(self) -> int:
+        """Number of lines read ahead and not yet returned."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def __call__(self, prompt: str = "") -> str:
+        if self._queue is None:
+            self._start()
+
+        waiting = self._queue.empty()
+        if waiting and self.interactive:
+            print(prompt, end="", flush=True)
+        line = await self._queue.get()
+        if line is None:
+            # Keep reporting end of input to later calls
+            self._queue.put_nowait(None)
+            raise EOFError
+        if not waiting or not self.interactive:
+            print(f"{prompt}{line}", flush=True)
+        return line
+
+
+_stdin: AsyncInput | None = None
+
+
+async def ainput(prompt: str = "") -> str:
+    """Async replacement for `input()` that reads stdin without blocking the event loop."""
+    global _stdin
+    if _stdin is None:
+        _stdin = AsyncInput()
+    return await _stdin(prompt)
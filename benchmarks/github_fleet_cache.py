@@ -0,0 +1,111 @@
+"""
+Counts the requests a fleet of GitHub agent processes sends upstream, each process with no
+cache ("off") and all of them sharing one GitHubResponseCache file ("shared"). Every process
+asks for issues picked at random among --distinct ones. The GitHub stand-in runs in each
+process, answers after --latency seconds and honors If-None-Match.
+
+    python benchmarks/github_fleet_cache.py --replicas 1 2 4 8 --queries 200 --distinct 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from github import GitHubPlugin, GitHubSettings
+from github_cache import GitHubResponseCache
+
+
+class CountingGitHubPlugin(GitHubPlugin):
+    """GitHubPlugin whose requests go to an in-process GitHub stand-in that counts them."""
+
+    latency = 0.0
+    upstream = {"200": 0, "304": 0}
+
+    def create_client(self) -> httpx.AsyncClient:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(self.latency)
+            number = int(request.url.path.rsplit("/", 1)[-1])
+            etag = f'"issue-{number}"'
+            if request.headers.get("if-none-match") == etag:
+                self.upstream["304"] += 1
+                return httpx.Response(304, headers={"ETag": etag})
+            self.upstream["200"] += 1
+            body = {
+                "id": number,
+                "number": number,
+                "html_url": f"https://github.com/microsoft/semantic-kernel/issues/{number}",
+                "title": f"Issue {number}",
+                "state": "open",
+                "labels": [],
+                "body": "x" * 2000,
+            }
+            return httpx.Response(200, json=body, headers={"ETag": etag})
+
+        return httpx.AsyncClient(base_url=self.settings.base_url, transport=httpx.MockTransport(handler))
+
+    @staticmethod
+    async def make_request(client: httpx.AsyncClient, path: str) -> dict:
+        response = await client.get(path)
+        response.raise_for_status()
+        return response.json()
+
+
+async def replica(cache_path: str | None, args, seed: int) -> dict:
+    cache = GitHubResponseCache(cache_path) if cache_path else None
+    plugin = CountingGitHubPlugin(GitHubSettings(token="stub"), cache=cache)
+    plugin.latency = args.latency
+    rng = random.Random(seed)
+    queries = [rng.randint(1, args.distinct) for _ in range(args.queries)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def ask(number: int):
+        async with semaphore:
+            await plugin.get_issue_detail("microsoft", "semantic-kernel", number)
+
+    await asyncio.gather(*[ask(number) for number in queries])
+    return dict(plugin.upstream)
+
+
+def run_replica(cache_path: str | None, args, seed: int) -> dict:
+    # The stdout of the plugin's request log is not part of the measurement
+    sys.stdout = open(os.devnull, "w")
+    return asyncio.run(replica(cache_path, args, seed))
+
+
+def fleet(replicas: int, cache_path: str | None, args) -> tuple[dict, float]:
+    start = time.perf_counter()
+    with multiprocessing.Pool(replicas) as pool:
+        results = pool.starmap(run_replica, [(cache_path, args, seed) for seed in range(replicas)])
+    elapsed = time.perf_counter() - start
+    return {status: sum(result[status] for result in results) for status in ("200", "304")}, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=200, help="tool calls per replica")
+    parser.add_argument("--distinct", type=int, default=20, help="distinct issues the calls pick from")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent tool calls per replica")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per upstream request")
+    args = parser.parse_args()
+
+    print(f"{'replicas':>8} {'mode':>7} {'upstream 200':>13} {'upstream 304':>13} {'seconds':>8}")
+    for replicas in args.replicas:
+        for mode in ("off", "shared"):
+            with tempfile.TemporaryDirectory() as directory:
+                cache_path = os.path.join(directory, "github_cache.sqlite3") if mode == "shared" else None
+                upstream, elapsed = fleet(replicas, cache_path, args)
+            print(f"{replicas:>8} {mode:>7} {upstream['200']:>13} {upstream['304']:>13} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
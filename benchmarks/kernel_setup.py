@@ -0,0 +1,85 @@
+"""
+Measures startup and per-request kernel overhead: building a kernel from scratch versus
+cloning the shared template, and serializing the tool schemas versus reusing the cache.
+No model or GitHub call is made, so placeholder credentials are enough.
+
+    python benchmarks/kernel_setup.py --requests 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("GITHUB_ACCESS_TOKEN", "benchmark")
+
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.function_calling_utils import update_settings_from_function_call_configuration
+from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatPromptExecutionSettings
+
+import kernel_registry
+from agent_metrics import TimedOpenAIChatCompletion, instrument_kernel
+from parallel_tools import enable_parallel_tool_calls
+
+PLUGINS = ("Lights", "GithubPlugin", "Population")
+
+
+def build_from_scratch() -> Kernel:
+    """What each entry point did before the registry: a new service, plugin reflection and filters."""
+    kernel = Kernel()
+    kernel.add_service(TimedOpenAIChatCompletion(api_key="benchmark", ai_model_id="gpt-4o-mini", service_id="bench"))
+    for name in PLUGINS:
+        kernel.add_plugin(kernel_registry.PLUGINS[name](), plugin_name=name)
+    enable_parallel_tool_calls(kernel)
+    instrument_kernel(kernel)
+    return kernel
+
+
+def per_call(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count
+
+
+def configure(kernel: Kernel, callback) -> OpenAIChatPromptExecutionSettings:
+    settings = OpenAIChatPromptExecutionSettings(function_choice_behavior=FunctionChoiceBehavior.Auto())
+    settings.function_choice_behavior.configure(kernel, callback, settings)
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    kernel_registry.kernel_template("bench", PLUGINS, parallel_tools=True)
+    startup = time.perf_counter() - start
+    template = kernel_registry.kernel_template("bench", PLUGINS, parallel_tools=True)
+    tools = len(template.get_full_list_of_function_metadata())
+
+    scratch = per_call(build_from_scratch, max(args.requests // 100, 5))
+    clone = per_call(lambda: kernel_registry.get_kernel("bench", PLUGINS, parallel_tools=True), args.requests)
+    deep_clone = per_call(template.clone, max(args.requests // 100, 5))
+
+    serialize = per_call(lambda: configure(template, update_settings_from_function_call_configuration), args.requests)
+    cached = per_call(lambda: configure(template, kernel_registry.update_settings_with_cached_tools), args.requests)
+    assert configure(template, update_settings_from_function_call_configuration).tools == configure(
+        template, kernel_registry.update_settings_with_cached_tools
+    ).tools
+
+    print(f"{len(PLUGINS)} plugins, {tools} tools")
+    print(f"template build (once)      {startup * 1000:9.2f} ms")
+    print(f"kernel from scratch        {scratch * 1e6:9.1f} us/request")
+    print(f"Kernel.clone (deep copy)   {deep_clone * 1e6:9.1f} us/request")
+    print(f"get_kernel (shared clone)  {clone * 1e6:9.1f} us/request  {scratch / clone:7.0f}x")
+    print(f"tool schemas serialized    {serialize * 1e6:9.1f} us/request")
+    print(f"tool schemas cached        {cached * 1e6:9.1f} us/request  {serialize / cached:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Measures the lights agent's context for a growing number of lights: the size of the light
+list the prompt used to carry against the matched candidates, and the lookup time.
+
+    python benchmarks/light_lookup.py --lights 10 100 1000 10000 --queries 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from light_catalog import LightCatalog, describe_lights, light_context
+
+ROOMS = "kitchen bedroom hallway garage office attic basement patio garden nursery study pantry den loft".split()
+KINDS = "light lamp spotlight sconce pendant strip chandelier downlight".split()
+VERBS = ["turn on the {}", "switch off the {}", "is the {} on?", "turn off {}"]
+
+
+def make_lights(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {"id": i, "name": f"{rng.choice(ROOMS).title()} {rng.choice(KINDS)} {i}", "is_on": rng.random() < 0.5}
+        for i in range(1, count + 1)
+    ]
+
+
+def make_queries(lights: list[dict], count: int, rng: random.Random) -> list[str]:
+    queries = []
+    for _ in range(count):
+        name = rng.choice(lights)["name"].lower()
+        if rng.random() < 0.3:
+            # A typo: two letters swapped
+            i = rng.randrange(len(name) - 1)
+            name = name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+        queries.append(rng.choice(VERBS).format(name))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lights", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'lights':>8} {'full list chars':>16} {'context chars':>14} {'build ms':>9} {'lookup us':>10}")
+    for count in args.lights:
+        lights = make_lights(count, rng)
+        queries = make_queries(lights, args.queries, rng)
+
+        start = time.perf_counter()
+        catalog = LightCatalog(lights)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        contexts = [light_context(catalog, query) for query in queries]
+        lookup = (time.perf_counter() - start) / len(queries)
+
+        context_chars = sum(len(value) for context in contexts for value in context.values()) / len(contexts)
+        print(
+            f"{count:>8} {len(describe_lights(lights)):>16} {context_chars:>14.0f} "
+            f"{build * 1000:>9.1f} {lookup * 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
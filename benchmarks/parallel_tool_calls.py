@@ -0,0 +1,100 @@
+"""
+Measures turn time for a model response that requests several GitHub tool calls at once,
+running against a stub LLM and a stub GitHub backend with fixed latencies.
+
+    python benchmarks/parallel_tool_calls.py --calls 5 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
+from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
+from semantic_kernel.contents import ChatHistory
+
+from github import GitHubPlugin, GitHubSettings
+from parallel_tools import enable_parallel_tool_calls
+from stub_llm import StubChatCompletion
+
+
+class StubGitHubPlugin(GitHubPlugin):
+    """GitHubPlugin that talks to an in-process GitHub stand-in instead of api.github.com."""
+
+    latency = 0.0
+
+    def create_client(self) -> httpx.AsyncClient:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(self.latency)
+            number = int(request.url.path.rsplit("/", 1)[-1])
+            return httpx.Response(
+                200,
+                json={
+                    "id": number,
+                    "number": number,
+                    "html_url": f"https://github.com/microsoft/semantic-kernel/issues/{number}",
+                    "title": f"Issue {number}",
+                    "state": "open",
+                    "labels": [],
+                    "body": "",
+                },
+            )
+
+        return httpx.AsyncClient(base_url=self.settings.base_url, transport=httpx.MockTransport(handler))
+
+    @staticmethod
+    async def make_request(client: httpx.AsyncClient, path: str) -> dict:
+        response = await client.get(path)
+        response.raise_for_status()
+        return response.json()
+
+
+async def run_turns(calls: int, latency: float, turns: int, max_concurrency: int | None) -> float:
+    kernel = Kernel()
+    plugin = StubGitHubPlugin(GitHubSettings(token="stub"))
+    plugin.latency = latency
+    kernel.add_plugin(plugin, plugin_name="GithubPlugin")
+    if max_concurrency is not None:
+        enable_parallel_tool_calls(kernel, max_concurrency=max_concurrency)
+
+    service = StubChatCompletion(
+        tool_calls=[
+            ("GithubPlugin-get_issue_detail", {"organization": "microsoft", "repo": "semantic-kernel", "issue_id": i})
+            for i in range(1, calls + 1)
+        ]
+    )
+    settings = PromptExecutionSettings()
+    settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        history = ChatHistory()
+        history.add_user_message("Summarize these issues")
+        await service.get_chat_message_content(chat_history=history, settings=settings, kernel=kernel)
+    return (time.perf_counter() - start) / turns
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5, help="tool calls per model response")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub GitHub latency in seconds")
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    modes = [("serial (limit 1)", 1), ("default kernel", None), (f"parallel (limit {args.calls})", args.calls)]
+    baseline = None
+    for label, limit in modes:
+        turn_time = await run_turns(args.calls, args.latency, args.turns, limit)
+        baseline = baseline or turn_time
+        print(f"{label:<22} {turn_time * 1000:8.1f} ms/turn  {baseline / turn_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
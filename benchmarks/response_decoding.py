@@ -0,0 +1,130 @@
+"""
+Measures extracting the text of A2A responses with the typed decoder against the previous
+extraction in the client (a throwaway model_dump, hasattr chains and, when they miss, a full
+indented model_dump_json), on a message and on a task with many multi-part artifacts.
+
+    python benchmarks/response_decoding.py --artifacts 50 --parts 20 --repeat 200
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "multi_agent_a2a"))
+
+from a2a.types import (
+    Artifact,
+    DataPart,
+    Message,
+    Part,
+    Role,
+    SendMessageResponse,
+    SendMessageSuccessResponse,
+    Task,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+from a2a_responses import decode_response
+
+LINE = "Issue #{0}: Kernel function fails to serialize nested pydantic models when streaming. " * 3
+
+
+def previous_extraction(response) -> list[str]:
+    """The client's extraction before the decoder, collecting what it printed."""
+    output = []
+    response.model_dump()
+    message_found = False
+    if hasattr(response, 'message') and response.message:
+        if hasattr(response.message, 'parts') and response.message.parts:
+            for part in response.message.parts:
+                if hasattr(part, 'root') and hasattr(part.root, 'text'):
+                    output.append(part.root.text)
+                    message_found = True
+    if hasattr(response, 'result') and response.result:
+        if hasattr(response.result, 'message') and response.result.message:
+            if hasattr(response.result.message, 'parts') and response.result.message.parts:
+                for part in response.result.message.parts:
+                    if hasattr(part, 'root') and hasattr(part.root, 'text'):
+                        output.append(part.root.text)
+                        message_found = True
+    if hasattr(response, 'events') and response.events:
+        for event in response.events:
+            if hasattr(event, 'message') and event.message:
+                if hasattr(event.message, 'parts') and event.message.parts:
+                    for part in event.message.parts:
+                        if hasattr(part, 'root') and hasattr(part.root, 'text'):
+                            output.append(part.root.text)
+                            message_found = True
+    if not message_found:
+        output.append(response.model_dump_json(indent=4))
+    return output
+
+
+def parts(count: int, offset: int) -> list[Part]:
+    result = []
+    for i in range(count):
+        if i % 5 == 4:
+            result.append(Part(root=DataPart(data={"number": offset + i, "labels": ["bug", "python"], "open": True})))
+        else:
+            result.append(Part(root=TextPart(text=LINE.format(offset + i))))
+    return result
+
+
+def message_response(part_count: int) -> SendMessageResponse:
+    message = Message(role=Role.agent, messageId=str(uuid.uuid4()), parts=parts(part_count, 0))
+    return SendMessageResponse(root=SendMessageSuccessResponse(id="1", result=message))
+
+
+def task_response(artifact_count: int, part_count: int) -> SendMessageResponse:
+    task = Task(
+        id=str(uuid.uuid4()),
+        contextId=str(uuid.uuid4()),
+        status=TaskStatus(
+            state=TaskState.completed,
+            message=Message(role=Role.agent, messageId=str(uuid.uuid4()), parts=parts(1, 0)),
+        ),
+        artifacts=[
+            Artifact(artifactId=str(uuid.uuid4()), name=f"result-{a}", parts=parts(part_count, a * part_count))
+            for a in range(artifact_count)
+        ],
+    )
+    return SendMessageResponse(root=SendMessageSuccessResponse(id="1", result=task))
+
+
+def per_call(fn, response, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(response)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifacts", type=int, default=50, help="artifacts in the task response")
+    parser.add_argument("--parts", type=int, default=20, help="parts per message or artifact")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = {
+        f"message, {args.parts} parts": message_response(args.parts),
+        f"task, {args.artifacts}x{args.parts} parts": task_response(args.artifacts, args.parts),
+    }
+    for name, response in cases.items():
+        reply = decode_response(response)
+        previous = per_call(previous_extraction, response, args.repeat)
+        decoded = per_call(decode_response, response, args.repeat)
+        found = "texts found" if not previous_extraction(response)[0].lstrip().startswith("{") else "dumped as JSON"
+        print(
+            f"{name:<26} previous {previous * 1e6:9.1f} us ({found})   decoder {decoded * 1e6:8.1f} us  "
+            f"{previous / decoded:6.1f}x   {len(reply.texts)} texts, {len(reply.data)} data parts"
+        )
+
+
+if __name__ == "__main__":
+    main()
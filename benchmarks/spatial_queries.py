@@ -0,0 +1,72 @@
+"""
+Measures GridIndex radius, nearest and bounding box queries against a brute-force haversine
+scan, on the admin1 coordinates replicated (with jitter) to --scale times the row count.
+
+    python benchmarks/spatial_queries.py --scale 100 --queries 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from population_plugin import ADMIN1_CSV, ADMIN1_SCHEMA, CACHE_DIRECTORY, load_table
+from spatial_index import GridIndex, haversine_km
+
+
+def per_query(fn, points: np.ndarray) -> float:
+    start = time.perf_counter()
+    for lat, lon in points:
+        fn(lat, lon)
+    return (time.perf_counter() - start) / len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=100, help="copies of the admin1 rows")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--radius", type=float, default=500, help="radius search distance in km")
+    parser.add_argument("--k", type=int, default=10, help="rows returned by nearest")
+    args = parser.parse_args()
+
+    table = load_table("admin1", ADMIN1_CSV, ADMIN1_SCHEMA, CACHE_DIRECTORY)
+    rng = np.random.default_rng(0)
+    lat = np.tile(np.asarray(table.column("Lat")), args.scale) + rng.normal(0, 0.5, len(table) * args.scale)
+    lon = np.tile(np.asarray(table.column("Long")), args.scale) + rng.normal(0, 0.5, len(table) * args.scale)
+    lat = np.clip(lat, -90, 90)
+
+    start = time.perf_counter()
+    index = GridIndex(lat, lon)
+    build = time.perf_counter() - start
+
+    # Query around existing rows, which is where questions are asked
+    points = np.column_stack([lat, lon])[rng.integers(0, len(lat), args.queries)]
+
+    def brute_radius(qlat, qlon):
+        distances = haversine_km(qlat, qlon, lat, lon)
+        return np.nonzero(distances <= args.radius)[0]
+
+    def brute_nearest(qlat, qlon):
+        return np.argpartition(haversine_km(qlat, qlon, lat, lon), args.k - 1)[: args.k]
+
+    print(f"{len(lat)} rows, index built in {build * 1000:.1f} ms")
+    results = [
+        ("within_radius", lambda a, b: index.within_radius(a, b, args.radius), brute_radius),
+        ("nearest", lambda a, b: index.nearest(a, b, args.k), brute_nearest),
+        ("within_bounds", lambda a, b: index.within_bounds(a - 2, b - 3, a + 2, b + 3), None),
+    ]
+    for label, indexed, brute in results:
+        indexed_time = per_query(indexed, points)
+        line = f"{label:<14} {indexed_time * 1e6:9.1f} us/query"
+        if brute is not None:
+            brute_time = per_query(brute, points[: max(len(points) // 10, 1)])
+            line += f"   brute force {brute_time * 1e6:9.1f} us/query  {brute_time / indexed_time:6.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
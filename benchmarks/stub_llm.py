@@ -0,0 +1,42 @@
+import asyncio
+import json
+from typing import Any, ClassVar
+
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
+from semantic_kernel.contents import ChatHistory, ChatMessageContent, FunctionCallContent, FunctionResultContent
+from semantic_kernel.contents.utils.author_role import AuthorRole
+
+
+class StubChatCompletion(ChatCompletionClientBase):
+    """Offline chat completion service with a fixed latency and a scripted set of tool calls.
+
+    The first request of a turn answers with every call in `tool_calls` (as "Plugin-function", arguments)
+    pairs, the request that follows the tool results answers with plain text.
+    """
+
+    SUPPORTS_FUNCTION_CALLING: ClassVar[bool] = True
+
+    ai_model_id: str = "stub"
+    latency: float = 0.0
+    tool_calls: list[tuple[str, dict[str, Any]]] = []
+
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> list[ChatMessageContent]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        last = chat_history.messages[-1] if chat_history.messages else None
+        answered = last is not None and any(isinstance(item, FunctionResultContent) for item in last.items)
+        if self.tool_calls and not answered:
+            items = [
+                FunctionCallContent(id=f"call_{index}", name=name, arguments=json.dumps(arguments))
+                for index, (name, arguments) in enumerate(self.tool_calls)
+            ]
+            return [ChatMessageContent(role=AuthorRole.ASSISTANT, items=items)]
+
+        results = [item for item in chat_history.messages if item.role == AuthorRole.TOOL]
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content=f"Done ({len(results)} tool results).")]
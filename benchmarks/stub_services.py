@@ -0,0 +1,159 @@
+"""
+Offline stand-ins for the OpenAI chat completions API and the GitHub REST API, served on one
+port so the agents and A2A servers can be benchmarked without network access or API keys.
+
+Point the servers at it with OPENAI_BASE_URL=http://127.0.0.1:PORT/v1 and
+GITHUB_API_URL=http://127.0.0.1:PORT/github.
+
+    python benchmarks/stub_services.py --port 8900 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# Tools the stub model calls whenever a request offers them, with their arguments
+SCRIPTED_CALLS = {
+    "Lights-get_lights": {},
+    "GithubPlugin-get_issues": {"organization": "microsoft", "repo": "semantic-kernel", "max_results": 30},
+}
+
+ISSUE_COUNT = 30
+
+
+def issue(number: int) -> dict:
+    return {
+        "id": 1000 + number,
+        "number": number,
+        "html_url": f"https://github.com/microsoft/semantic-kernel/issues/{number}",
+        "title": f"Kernel function fails to serialize nested models when streaming ({number})",
+        "state": "open" if number % 3 else "closed",
+        "labels": [
+            {"id": 1, "name": "bug", "description": "Something isn't working"},
+            {"id": 2, "name": "python", "description": None},
+        ],
+        "created_at": "2025-06-01T12:00:00Z",
+        "closed_at": None if number % 3 else "2025-06-03T08:30:00Z",
+        "body": "Steps to reproduce:\n1. Create a kernel\n2. Stream a response\n" * 4,
+    }
+
+
+def chat_completion(model: str, message: dict, prompt_chars: int) -> dict:
+    prompt_tokens = prompt_chars // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": message, "finish_reason": "tool_calls" if "tool_calls" in message else "stop"}
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 20,
+            "total_tokens": prompt_tokens + 20,
+            # Whole 1024-token blocks of the prompt count as cached, like a warm provider cache
+            "prompt_tokens_details": {"cached_tokens": prompt_tokens // 1024 * 1024},
+        },
+    }
+
+
+def chat_completion_chunks(completion: dict, include_usage: bool):
+    """The completion as the server-sent events of a streamed response: role, then the answer, then usage."""
+    message = completion["choices"][0]["message"]
+    answer = {"content": message["content"]} if message["content"] else {}
+    if "tool_calls" in message:
+        answer["tool_calls"] = [{"index": index, **call} for index, call in enumerate(message["tool_calls"])]
+    head = {key: completion[key] for key in ("id", "created", "model")}
+    deltas = [({"role": "assistant", "content": ""}, None), (answer, completion["choices"][0]["finish_reason"])]
+    for delta, finish_reason in deltas:
+        choice = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+        chunk = {**head, "object": "chat.completion.chunk", "choices": [choice]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    if include_usage:
+        chunk = {**head, "object": "chat.completion.chunk", "choices": [], "usage": completion["usage"]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def build_app(latency: float) -> Starlette:
+    async def completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        messages = body.get("messages", [])
+        offered = {tool["function"]["name"] for tool in body.get("tools") or ()}
+        calls = [name for name in SCRIPTED_CALLS if name in offered]
+        if calls and not any(message.get("role") == "tool" for message in messages):
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{index}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps(SCRIPTED_CALLS[name])},
+                    }
+                    for index, name in enumerate(calls)
+                ],
+            }
+        else:
+            results = sum(message.get("role") == "tool" for message in messages)
+            message = {"role": "assistant", "content": f"Done ({results} tool results)."}
+        completion = chat_completion(body.get("model", "stub"), message, len(json.dumps(messages)))
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(chat_completion_chunks(completion, include_usage), media_type="text/event-stream")
+        return JSONResponse(completion)
+
+    async def models(request: Request):
+        # Answers the connection warm-up
+        return JSONResponse({"object": "list", "data": []})
+
+    async def repository(request: Request):
+        name = f"{request.path_params['owner']}/{request.path_params['repo']}"
+        return JSONResponse({"id": 1, "full_name": name, "description": None, "html_url": f"https://github.com/{name}"})
+
+    async def issues(request: Request):
+        count = min(int(request.query_params.get("per_page", ISSUE_COUNT)), 100)
+        return JSONResponse([issue(number) for number in range(1, count + 1)])
+
+    async def issue_detail(request: Request):
+        return JSONResponse(issue(int(request.path_params["number"])))
+
+    async def user(request: Request):
+        return JSONResponse(
+            {"id": 1, "login": "octocat", "name": "Octocat", "company": None, "html_url": "https://github.com/octocat"}
+        )
+
+    return Starlette(
+        routes=[
+            Route("/v1/chat/completions", completions, methods=["POST"]),
+            Route("/v1", models),
+            Route("/v1/models", models),
+            Route("/github/user", user),
+            Route("/github/repos/{owner}/{repo}", repository),
+            Route("/github/repos/{owner}/{repo}/issues", issues),
+            Route("/github/repos/{owner}/{repo}/issues/{number:int}", issue_detail),
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds each model response takes")
+    args = parser.parse_args()
+    uvicorn.run(build_app(args.latency), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
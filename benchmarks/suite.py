@@ -0,0 +1,326 @@
+"""
+Runs the offline benchmark suite and compares it with a stored baseline.
+
+Micro benchmarks time LightsPlugin.get_state/change_state, GitHubPlugin requests and parsing
+against the stub GitHub API, and the A2A request building and reply decoding behind
+send_to_pool. Macro scenarios start lights_server.py and github_server.py against
+the stub OpenAI API (benchmarks/stub_services.py) and drive them with concurrent A2A clients.
+Nothing leaves the machine.
+
+Results are written as JSON. With a baseline, every metric that got worse by more than
+--tolerance is reported and the exit status is 1. benchmarks/baseline.json was recorded with
+the default settings on the machine named in its "platform" field. Timings depend on the
+hardware, so on another machine record a baseline from the base commit first.
+
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --output results.json
+    python benchmarks/suite.py --micro-only --repeat 500
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+A2A_DIRECTORY = os.path.join(ROOT, "multi_agent_a2a")
+sys.path.append(ROOT)
+sys.path.append(A2A_DIRECTORY)
+
+# The decorators run as pass-throughs, so results do not depend on a collector being reachable
+os.environ.setdefault("TELEMETRY_MODE", "off")
+
+from a2a.client import A2AClient
+
+from a2a_responses import decode_response
+from client import build_message_request
+from github import GitHubPlugin, GitHubSettings, Issue
+from lights_plugin import LightsPlugin
+from response_decoding import message_response, task_response
+from stub_services import issue
+
+SERVERS = {
+    "lights": ("lights_server.py", "LIGHTS_SERVER", "Show me all the lights and their current state"),
+    "github": ("github_server.py", "GITHUB_SERVER", "List the open issues in microsoft/semantic-kernel"),
+}
+STARTUP_TIMEOUT = 60.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def per_call_us(fn, repeat: int, rounds: int) -> float:
+    """Median over `rounds` of the mean time per call, in microseconds."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        timings.append((time.perf_counter() - start) / repeat)
+    return statistics.median(timings) * 1e6
+
+
+async def per_call_us_async(fn, repeat: int, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await fn()
+        timings.append((time.perf_counter() - start) / repeat)
+    return statistics.median(timings) * 1e6
+
+
+async def micro(stub_url: str, repeat: int, rounds: int) -> dict[str, dict]:
+    lights = LightsPlugin()
+    github = GitHubPlugin(GitHubSettings(token="stub", base_url=f"{stub_url}/github"))
+    issues = [issue(number) for number in range(1, 31)]
+    message, task = message_response(5), task_response(10, 5)
+    # Each request opens its own client, so a round trip costs more than a dict lookup
+    requests = max(repeat // 10, 1)
+
+    # GitHubPlugin prints every request it makes
+    with contextlib.redirect_stdout(io.StringIO()):
+        requested = {
+            "micro.github.get_repository": await per_call_us_async(
+                lambda: github.get_repository("microsoft", "semantic-kernel"), requests, rounds
+            ),
+            "micro.github.get_issues": await per_call_us_async(
+                lambda: github.get_issues("microsoft", "semantic-kernel", max_results=30), requests, rounds
+            ),
+        }
+    results = {
+        "micro.lights.get_state": per_call_us(lights.get_state, repeat, rounds),
+        "micro.lights.change_state": per_call_us(lambda: lights.change_state(2, True), repeat, rounds),
+        "micro.github.parse_issues": per_call_us(lambda: [Issue(**item) for item in issues], repeat, rounds),
+        **requested,
+        "micro.a2a.build_request": per_call_us(lambda: build_message_request("Turn on the light"), repeat, rounds),
+        "micro.a2a.decode_message": per_call_us(lambda: decode_response(message), repeat, rounds),
+        "micro.a2a.decode_task": per_call_us(lambda: decode_response(task), repeat, rounds),
+    }
+    return {name: metric(value, "us") for name, value in results.items()}
+
+
+class Processes:
+    """Starts the stub services and the A2A servers as child processes and stops them on exit."""
+
+    def __init__(self, log_directory: str):
+        self.log_directory = log_directory
+        self.children: list[subprocess.Popen] = []
+
+    def start(self, name: str, args: list[str], cwd: str, env: dict[str, str]) -> subprocess.Popen:
+        log = open(os.path.join(self.log_directory, f"{name}.log"), "wb")
+        child = subprocess.Popen(
+            [sys.executable, *args], cwd=cwd, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT
+        )
+        log.close()
+        self.children.append(child)
+        return child
+
+    def log(self, name: str) -> str:
+        with open(os.path.join(self.log_directory, f"{name}.log"), errors="replace") as file:
+            return file.read()[-2000:]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for child in self.children:
+            child.terminate()
+        for child in self.children:
+            try:
+                child.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                child.kill()
+
+
+async def wait_ready(url: str, child: subprocess.Popen, name: str, processes: Processes):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if child.poll() is not None:
+                raise RuntimeError(f"{name} exited with status {child.returncode}:\n{processes.log(name)}")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{name} did not start within {STARTUP_TIMEOUT:.0f} s:\n{processes.log(name)}")
+
+
+async def drive(url: str, text: str, requests: int, concurrency: int, warmup: int) -> dict[str, dict]:
+    """Send `requests` messages to an A2A server from `concurrency` clients at once."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(60.0), limits=limits) as httpx_client:
+        client = A2AClient(httpx_client=httpx_client, url=url)
+        latencies: list[float] = []
+        errors = 0
+
+        async def send(record: bool):
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                reply = decode_response(await client.send_message(build_message_request(text)))
+                ok = reply.ok and not reply.text.startswith("Error")
+            except Exception:
+                ok = False
+            if record:
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        async def worker(count: int, record: bool):
+            for _ in range(count):
+                await send(record)
+
+        def split(total: int) -> list[int]:
+            return [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+
+        await asyncio.gather(*[worker(count, False) for count in split(warmup)])
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(count, True) for count in split(requests)])
+        elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "throughput": metric(len(latencies) / elapsed, "req/s", "higher"),
+        "p50": metric(quantiles[49] * 1000, "ms"),
+        "p95": metric(quantiles[94] * 1000, "ms"),
+        "p99": metric(quantiles[98] * 1000, "ms"),
+        "errors": metric(errors, "requests"),
+    }
+
+
+async def macro(stub_url: str, processes: Processes, args) -> dict[str, dict]:
+    results = {}
+    for scenario in args.scenarios:
+        script, prefix, text = SERVERS[scenario]
+        port = free_port()
+        env = {
+            f"{prefix}_HOST": "127.0.0.1",
+            f"{prefix}_PORT": str(port),
+            "OPENAI_BASE_URL": f"{stub_url}/v1",
+            "OPENAI_API_KEY": "stub",
+            "GITHUB_API_URL": f"{stub_url}/github",
+            "GITHUB_ACCESS_TOKEN": "stub",
+            # Every run starts with an empty GitHub cache of its own
+            "GITHUB_CACHE_PATH": os.path.join(processes.log_directory, f"{scenario}.github_cache.sqlite3"),
+        }
+        child = processes.start(scenario, [script], A2A_DIRECTORY, env)
+        url = f"http://127.0.0.1:{port}/"
+        await wait_ready(url + ".well-known/agent.json", child, scenario, processes)
+        for concurrency in args.concurrency:
+            measured = await drive(url, text, args.requests, concurrency, warmup=concurrency * 2)
+            for name, value in measured.items():
+                results[f"macro.{scenario}.c{concurrency}.{name}"] = value
+        child.terminate()
+        child.wait(timeout=10)
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Print every metric next to its baseline, returning the names of those that regressed."""
+    regressions = []
+    print(f"\n{'metric':<40} {'value':>12} {'baseline':>12} {'change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<40} {current['value']:>12.3f} {'-':>12} {'new':>8}")
+            continue
+        before, after = previous["value"], current["value"]
+        if before:
+            change = (after - before) / before
+        else:
+            change = 0.0 if after == before else float("inf")
+        worse = change < -tolerance if current["better"] == "higher" else change > tolerance
+        if worse:
+            regressions.append(name)
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<40} {after:>12.3f} {before:>12.3f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+async def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as log_directory, Processes(log_directory) as processes:
+        stub_port = free_port()
+        stub_url = f"http://127.0.0.1:{stub_port}"
+        script = os.path.join(ROOT, "benchmarks", "stub_services.py")
+        stub_args = [script, "--port", str(stub_port), "--latency", str(args.llm_latency)]
+        stub = processes.start("stub_services", stub_args, ROOT, {})
+        await wait_ready(f"{stub_url}/v1/models", stub, "stub_services", processes)
+
+        results = await micro(stub_url, args.repeat, args.rounds)
+        if not args.micro_only:
+            results.update(await macro(stub_url, processes, args))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results stored in this JSON file")
+    parser.add_argument("--save-baseline", help="store the results as the baseline in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative change counted as a regression")
+    parser.add_argument("--repeat", type=int, default=1000, help="calls per round of a micro benchmark")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per micro benchmark, the median is kept")
+    parser.add_argument("--micro-only", action="store_true")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SERVERS), default=sorted(SERVERS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="seconds per stub model response")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            key: getattr(args, key)
+            for key in ("repeat", "rounds", "scenarios", "concurrency", "requests", "llm_latency")
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("settings") != report["settings"]:
+            print(f"Warning: the baseline was recorded with other settings: {baseline.get('settings')}")
+        if (baseline.get("platform"), baseline.get("python")) != (report["platform"], report["python"]):
+            print(f"Warning: the baseline was recorded on {baseline.get('platform')}, Python {baseline.get('python')}")
+        regressions = compare(results, baseline["results"], args.tolerance)
+    else:
+        for name, value in results.items():
+            print(f"{name:<40} {value['value']:>12.3f} {value['unit']}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measures concurrent agent turns whose tool is a sync function that blocks, with the function
+run on the event loop ("never"), moved to the thread pool once seen to be slow ("auto") or
+always run on the pool ("always"). The stub LLM answers every turn with one tool call.
+
+--work sleep blocks the way sync I/O does and releases the GIL, so the pool runs calls side
+by side. --work cpu holds the GIL, so the pool only keeps the loop responsive between calls.
+
+    python benchmarks/sync_offload.py --block 0.02 --turns 200 --concurrency 16 --work sleep
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
+from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
+from semantic_kernel.contents import ChatHistory
+from semantic_kernel.functions import kernel_function
+
+from server_runtime import offload_sync_functions
+from stub_llm import StubChatCompletion
+
+
+class BlockingPlugin:
+    def __init__(self, block: float, work: str):
+        self.block = block
+        self.work = work
+
+    @kernel_function(name="lookup", description="Looks something up synchronously")
+    def lookup(self) -> str:
+        if self.work == "sleep":
+            time.sleep(self.block)
+        else:
+            deadline = time.perf_counter() + self.block
+            while time.perf_counter() < deadline:
+                pass
+        return "found"
+
+
+async def probe_lag(lags: list[float], stop: asyncio.Event, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def run(mode: str, args) -> dict:
+    os.environ["SERVER_SYNC_OFFLOAD"] = mode
+    kernel = Kernel()
+    kernel.add_plugin(BlockingPlugin(args.block, args.work), plugin_name="Blocking")
+    offload_sync_functions(kernel)
+    service = StubChatCompletion(latency=args.llm_latency, tool_calls=[("Blocking-lookup", {})])
+    settings = PromptExecutionSettings()
+    settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
+
+    latencies: list[float] = []
+
+    async def turn():
+        history = ChatHistory()
+        history.add_user_message("Look it up")
+        start = time.perf_counter()
+        await service.get_chat_message_content(chat_history=history, settings=settings, kernel=kernel)
+        latencies.append(time.perf_counter() - start)
+
+    async def worker(count: int):
+        for _ in range(count):
+            await turn()
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(lags, stop))
+    counts = [args.turns // args.concurrency + (i < args.turns % args.concurrency) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(count) for count in counts])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    ordered = sorted(latencies)
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(ordered) * 1000,
+        "p99": ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1000,
+        "lag": max(lags) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--block", type=float, default=0.02, help="seconds each tool call blocks")
+    parser.add_argument("--work", choices=["sleep", "cpu"], default="sleep")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="seconds per stub model response")
+    args = parser.parse_args()
+
+    for mode in ("never", "auto", "always"):
+        result = await run(mode, args)
+        print(
+            f"{mode:<7} {result['throughput']:8.1f} turns/s   p50 {result['p50']:7.1f} ms   "
+            f"p99 {result['p99']:7.1f} ms   max loop lag {result['lag']:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
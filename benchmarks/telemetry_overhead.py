@@ -0,0 +1,85 @@
+"""
+Measures the per-call cost of the Observe `@tool` decorator on LightsPlugin.change_state
+in each telemetry mode. Every mode runs in its own process because the SDK is a singleton.
+Spans go to an exporter that discards them, so no collector is needed.
+
+    python benchmarks/telemetry_overhead.py --calls 20000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+def measure(mode: str, calls: int) -> dict:
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    from telemetry_config import init_telemetry
+
+    class DiscardingExporter(SpanExporter):
+        exported = 0
+
+        def export(self, spans):
+            DiscardingExporter.exported += len(spans)
+            return SpanExportResult.SUCCESS
+
+    init_telemetry("telemetry-benchmark", api_endpoint="http://localhost:4318", mode=mode, exporter=DiscardingExporter())
+
+    from lights_plugin import LightsPlugin
+
+    plugin = LightsPlugin()
+    undecorated = LightsPlugin.change_state.__wrapped__
+
+    def per_call(fn, *args) -> float:
+        for _ in range(min(calls, 1000)):
+            fn(*args)
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            fn(*args)
+        return (time.perf_counter_ns() - start) / calls
+
+    baseline = per_call(undecorated, plugin, 1, True)
+    decorated = per_call(plugin.change_state, 1, True)
+    return {
+        "mode": mode,
+        "calls": calls,
+        "baseline_ns": round(baseline),
+        "decorated_ns": round(decorated),
+        "overhead_ns": round(decorated - baseline),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.calls)))
+        return
+
+    env = dict(os.environ, OBSERVE_TELEMETRY="false", OBSERVE_METRICS_ENABLED="false", TELEMETRY_SAMPLE_RATE="0.1")
+    print(f"{'mode':<8} {'baseline':>10} {'decorated':>10} {'overhead':>10}")
+    for mode in ("off", "sampled", "full"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--calls", str(args.calls)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:<8} {result['baseline_ns']:>8}ns {result['decorated_ns']:>8}ns {result['overhead_ns']:>8}ns"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,21 @@ import logging
 import os
 
 from semantic_kernel.agents import AssistantAgentThread, OpenAIAssistantAgent, ChatCompletionAgent
-from semantic_kernel.contents import StreamingFileReferenceContent
 
 from ioa_observe.sdk.decorators import agent as agent_decorator
 from ioa_observe.sdk.tracing import session_start
-from ioa_observe.sdk import Observe
+
+from async_input import ainput
+from population_plugin import PopulationPlugin
+from stream_output import JsonlSink, OutputSink, StreamRenderer, TerminalSink
+from interpreter_downloads import download_files
+from interpreter_sessions import InterpreterSessionManager
+from interpreter_uploads import UploadManifest
+from openai_client import shared_openai_client
+from telemetry_config import init_telemetry
 
 # Initialize the Observe SDK
-Observe.init("openai_assistant_agent", api_endpoint=os.getenv("OTLP_HTTP_ENDPOINT"))
+init_telemetry("openai_assistant_agent")
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -38,83 +45,58 @@ csv_file_path_2 = os.path.join(
 class DecoratedOpenAIAssistantAgent(OpenAIAssistantAgent):
     pass
 
-async def download_file_content(agent: OpenAIAssistantAgent, file_id: str):
-    try:
-        # Fetch the content of the file using the provided method
-        response_content = await agent.client.files.content(file_id)
-
-        # Get the current working directory of the file
-        current_directory = os.path.dirname(os.path.abspath(__file__))
-
-        # Define the path to save the image in the current directory
-        file_path = os.path.join(
-            current_directory,  # Use the current directory of the file
-            f"{file_id}.png",  # You can modify this to use the actual filename with proper extension
-        )
-
-        # Save content to a file asynchronously
-        with open(file_path, "wb") as file:
-            file.write(response_content.content)
-
-        print(f"File saved to: {file_path}")
-    except Exception as e:
-        print(f"An error occurred while downloading file {file_id}: {str(e)}")
-
-
 async def download_response_image(agent: OpenAIAssistantAgent, file_ids: list[str]):
     if file_ids:
-        # Iterate over file_ids and download each one
-        for file_id in file_ids:
-            await download_file_content(agent, file_id)
+        # Download the generated files concurrently, streaming each one to disk
+        results = await download_files(agent.client, file_ids)
+        for file_id, result in results.items():
+            if isinstance(result, BaseException):
+                print(f"An error occurred while downloading file {file_id}: {str(result)}")
+            else:
+                print(f"File saved to: {result}")
 
 
 async def main():
-    # Create the client using Azure OpenAI resources and configuration
-    client = OpenAIAssistantAgent.create_client(
-        api_key=os.environ.get("OPENAI_API_KEY"),
-        ai_model_id="gpt-4o-mini"
-    )
+    # Use the process-wide OpenAI client, so uploads, runs and downloads share one connection pool
+    client = shared_openai_client()
     model = "gpt-4o-mini"
 
-    # Upload the files to the client
-    file_ids: list[str] = []
-    for path in [csv_file_path_1, csv_file_path_2]:
-        with open(path, "rb") as file:
-            file = await client.files.create(file=file, purpose="assistants")
-            file_ids.append(file.id)
-
-    # Get the code interpreter tool and resources
-    code_interpreter_tools, code_interpreter_tool_resources = OpenAIAssistantAgent.configure_code_interpreter_tool(
-        file_ids=file_ids
-    )
+    # Load the datasets once for local answers, the code interpreter is the fallback
+    population = PopulationPlugin()
 
-    # Create the assistant definition
-    definition = await client.beta.assistants.create(
+    # The session manager reuses uploads, the assistant and warm threads across turns and runs
+    sessions = InterpreterSessionManager(
+        client,
+        UploadManifest(),
         model=model,
         instructions="""
             Analyze the available data to provide an answer to the user's question.
+            Prefer the Population functions, which answer filters, rankings, group-bys, aggregates,
+            province-to-country comparisons and distance queries (nearest, within a radius or a
+            bounding box) locally. Only use the code interpreter on the uploaded files
+            for questions those functions cannot answer, such as charts.
             Always format response using markdown.
             Always include a numerical index that starts at 1 for any lists or tables.
             Always sort lists in ascending order.
             """,
         name="SampleAssistantAgent",
-        tools=code_interpreter_tools,
-        tool_resources=code_interpreter_tool_resources,
+        plugins=[population],
+        agent_class=DecoratedOpenAIAssistantAgent,
     )
+    await sessions.start()
 
-    # Create the agent using the client and the assistant definition
-    # agent = OpenAIAssistantAgent(
-    #     client=client,
-    #     definition=definition,
-    # )
-
-    thread: AssistantAgentThread = None
+    thread: AssistantAgentThread | None = None
 
     try:
+        agent = await sessions.agent([csv_file_path_1, csv_file_path_2])
+        thread = await sessions.acquire_thread()
+
         is_complete: bool = False
-        file_ids: list[str] = []
         while not is_complete:
-            user_input = input("User:> ")
+            try:
+                user_input = await ainput("User:> ")
+            except EOFError:
+                break
             if not user_input:
                 continue
 
@@ -125,48 +107,32 @@ async def main():
 
             session_start()
 
-            # Usage in your main function or agent creation logic:
-            agent = DecoratedOpenAIAssistantAgent(
-                client=client,
-                definition=definition,
-            )
-
-            is_code = False
-            last_role = None
-            async for response in agent.invoke_stream(messages=user_input, thread=thread):
-                current_is_code = response.metadata.get("code", False)
-
-                if current_is_code:
-                    if not is_code:
-                        print("\n\n```python")
-                        is_code = True
-                    print(response.content, end="", flush=True)
-                else:
-                    if is_code:
-                        print("\n```")
-                        is_code = False
-                        last_role = None
-                    if hasattr(response, "role") and response.role is not None and last_role != response.role:
-                        print(f"\n# {response.role}: ", end="", flush=True)
-                        last_role = response.role
-                    print(response.content, end="", flush=True)
-                file_ids.extend([
-                    item.file_id for item in response.items if isinstance(item, StreamingFileReferenceContent)
-                ])
-                thread = response.thread
-            if is_code:
-                print("```\n")
-            print()
-
-            await download_response_image(agent, file_ids)
-            file_ids.clear()
+            # Render the stream through buffered sinks, plus a JSONL record when STREAM_LOG is set
+            sinks: list[OutputSink] = [TerminalSink()]
+            if os.getenv("STREAM_LOG"):
+                sinks.append(JsonlSink(os.environ["STREAM_LOG"]))
+            renderer = StreamRenderer(sinks)
+            try:
+                async for response in agent.invoke_stream(messages=user_input, thread=thread):
+                    renderer.feed(response)
+                    thread = response.thread
+            finally:
+                renderer.close()
+
+            # Generated files are leased until they are downloaded, then deleted from the service
+            generated_file_ids = renderer.file_ids
+            sessions.track_files(generated_file_ids)
+            await download_response_image(agent, generated_file_ids)
+            await sessions.delete_files(generated_file_ids)
+            # Keep the thread's lease from expiring during a long conversation
+            sessions.renew()
 
     finally:
         print("\nCleaning up resources...")
-        [await client.files.delete(file_id) for file_id in file_ids]
-        await thread.delete() if thread else None
-        await client.beta.assistants.delete(agent.id)
-
+        if thread is not None:
+            await sessions.release_thread(thread)
+        # Uploaded files and the assistant definition are kept for the next run (see UploadManifest)
+        await sessions.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
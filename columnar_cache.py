@@ -0,0 +1,265 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1 << 20
+# Times the pointer is re-read when a concurrent ingest deletes the version it named, before ingesting
+OPEN_ATTEMPTS = 3
+
+
+class DictionaryColumn:
+    """A string column stored as fixed-width integer codes into a sorted dictionary of distinct values.
+
+    Because the dictionary is sorted and only holds values that occur, `(dictionary, codes)` is
+    exactly what `np.unique(values, return_inverse=True)` would return for the decoded column.
+    """
+
+    def __init__(self, codes: np.ndarray, dictionary: np.ndarray):
+        self.codes = codes
+        self.dictionary = dictionary
+        self._folded: np.ndarray | None = None
+
+    def folded(self) -> np.ndarray:
+        """Lowercased dictionary for case-insensitive matching, computed once."""
+        if self._folded is None:
+            self._folded = np.char.lower(self.dictionary)
+        return self._folded
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def decode(self, indices: np.ndarray | None = None) -> np.ndarray:
+        return self.dictionary[self.codes if indices is None else self.codes[indices]]
+
+
+class ColumnarDataset:
+    """Read-only view of an ingested dataset, built into columns on first access.
+
+    Every file of the version is memory-mapped up front, which reads no data but keeps the
+    files reachable after another process ingests a newer version and deletes this one.
+    """
+
+    def __init__(self, directory: str, schema: dict[str, Any]):
+        self.directory = directory
+        self.schema = schema
+        self.rows: int = schema["rows"]
+        self._columns: dict[str, np.ndarray | DictionaryColumn] = {}
+        self._specs = {spec["name"]: spec for spec in schema["columns"]}
+        self._files = {name: self._map_files(spec) for name, spec in self._specs.items()}
+
+    @property
+    def column_names(self) -> list[str]:
+        return list(self._specs)
+
+    def is_dictionary(self, name: str) -> bool:
+        return self._spec(name)["kind"] == "dictionary"
+
+    def column(self, name: str) -> np.ndarray | DictionaryColumn:
+        if name not in self._columns:
+            self._columns[name] = self._open(self._spec(name), self._files[name])
+        return self._columns[name]
+
+    def loaded_columns(self) -> list[str]:
+        return list(self._columns)
+
+    def _spec(self, name: str) -> dict[str, Any]:
+        if name not in self._specs:
+            raise ValueError(f"Unknown column {name!r}, expected one of {', '.join(self._specs)}")
+        return self._specs[name]
+
+    def _map(self, file_name: str, dtype: str, count: int) -> np.ndarray:
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, file_name), dtype=dtype, mode="r", shape=(count,))
+
+    def _map_files(self, spec: dict[str, Any]) -> tuple[np.ndarray, ...]:
+        if spec["kind"] == "numeric":
+            return (self._map(spec["file"], spec["dtype"], self.rows),)
+        offsets = self._map(spec["offsets_file"], "<i8", spec["dictionary_size"] + 1)
+        blob_size = int(offsets[-1]) if len(offsets) else 0
+        return (
+            self._map(spec["file"], spec["dtype"], self.rows),
+            offsets,
+            self._map(spec["dictionary_file"], "u1", blob_size),
+        )
+
+    @staticmethod
+    def _open(spec: dict[str, Any], files: tuple[np.ndarray, ...]) -> np.ndarray | DictionaryColumn:
+        if spec["kind"] == "numeric":
+            return files[0]
+
+        codes, offsets, blob = files
+        blob = blob.tobytes()
+        values = [blob[start:end].decode("utf-8") for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        return DictionaryColumn(codes, np.array(values, dtype=np.str_))
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _code_dtype(size: int) -> str:
+    if size <= np.iinfo(np.uint8).max + 1:
+        return "<u1"
+    if size <= np.iinfo(np.uint16).max + 1:
+        return "<u2"
+    return "<u4"
+
+
+def _write_columns(path: str, schema: dict[str, type], directory: str) -> dict[str, Any]:
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        values = list(zip(*reader))
+    raw = dict(zip(header, values))
+    rows = len(values[0]) if values else 0
+
+    columns = []
+    for index, (name, dtype) in enumerate(schema.items()):
+        if name not in raw and rows:
+            raise ValueError(f"Column {name!r} is missing from {path}")
+        column = raw.get(name, ())
+        file_name = f"{index:03d}.bin"
+        if np.dtype(dtype).kind == "U":
+            dictionary, codes = np.unique(np.array(column, dtype=np.str_), return_inverse=True)
+            code_dtype = _code_dtype(len(dictionary))
+            codes.astype(code_dtype).tofile(os.path.join(directory, file_name))
+            encoded = [value.encode("utf-8") for value in dictionary.tolist()]
+            offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+            offsets[1:] = np.cumsum([len(value) for value in encoded])
+            offsets.tofile(os.path.join(directory, f"{index:03d}.offsets.bin"))
+            with open(os.path.join(directory, f"{index:03d}.dict.bin"), "wb") as file:
+                file.write(b"".join(encoded))
+            columns.append(
+                {
+                    "name": name,
+                    "kind": "dictionary",
+                    "dtype": code_dtype,
+                    "file": file_name,
+                    "offsets_file": f"{index:03d}.offsets.bin",
+                    "dictionary_file": f"{index:03d}.dict.bin",
+                    "dictionary_size": len(dictionary),
+                }
+            )
+        else:
+            stored = np.dtype(dtype).newbyteorder("<")
+            np.array(column, dtype=dtype).astype(stored).tofile(os.path.join(directory, file_name))
+            columns.append({"name": name, "kind": "numeric", "dtype": stored.str, "file": file_name})
+    return {"rows": rows, "columns": columns}
+
+
+def _read_json(path: str) -> dict[str, Any] | None:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path: str, data: dict[str, Any]):
+    # A temp file per writer, so concurrent ingests do not rename each other's
+    descriptor, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-", dir=os.path.dirname(path))
+    with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temp_path, path)
+
+
+def _schema_signature(schema: dict[str, type]) -> list[list[str]]:
+    return [[name, np.dtype(dtype).str] for name, dtype in schema.items()]
+
+
+def open_csv(path: str, schema: dict[str, type], cache_directory: str, name: str | None = None) -> ColumnarDataset:
+    """Open a CSV through its columnar cache, ingesting it first when the cache is missing or stale.
+
+    Each ingested version lives in its own directory named after the CSV content hash, and
+    `current.json` points at the live one. An unchanged file (same size and mtime) opens
+    without reading the CSV at all. A touched file is hashed and only re-ingested when its
+    content actually changed. Another process can ingest a newer version and delete the one
+    the pointer named between reading the pointer and mapping the files, so a missing file
+    means the pointer is re-read, and after OPEN_ATTEMPTS the CSV is ingested again.
+    """
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    dataset_directory = os.path.join(cache_directory, name)
+    pointer_path = os.path.join(dataset_directory, "current.json")
+    stat = os.stat(path)
+    signature = _schema_signature(schema)
+
+    for _ in range(OPEN_ATTEMPTS):
+        current = _read_json(pointer_path)
+        if not (current and current.get("format") == FORMAT_VERSION and current.get("schema") == signature):
+            break
+        touched = (current["size"], current["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns)
+        if touched and current["sha256"] != file_digest(path):
+            break
+        try:
+            dataset = _open_version(os.path.join(dataset_directory, current["directory"]))
+        except FileNotFoundError:
+            continue
+        if touched:
+            current.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            _write_json(pointer_path, current)
+        return dataset
+
+    return ingest_csv(path, schema, cache_directory, name)
+
+
+def _open_version(directory: str) -> ColumnarDataset:
+    schema = _read_json(os.path.join(directory, "schema.json"))
+    if schema is None:
+        raise FileNotFoundError(f"No schema.json in {directory}")
+    return ColumnarDataset(directory, schema)
+
+
+def ingest_csv(path: str, schema: dict[str, type], cache_directory: str, name: str | None = None) -> ColumnarDataset:
+    """Convert a CSV into the columnar format and make it the current version of the dataset."""
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    dataset_directory = os.path.join(cache_directory, name)
+    os.makedirs(dataset_directory, exist_ok=True)
+
+    stat = os.stat(path)
+    digest = file_digest(path)
+    build_directory = tempfile.mkdtemp(prefix=".build-", dir=dataset_directory)
+    try:
+        layout = _write_columns(path, schema, build_directory)
+        dataset_schema = {"format": FORMAT_VERSION, "source": os.path.basename(path), "sha256": digest, **layout}
+        _write_json(os.path.join(build_directory, "schema.json"), dataset_schema)
+
+        version = f"{digest[:16]}-{os.getpid()}"
+        version_directory = os.path.join(dataset_directory, version)
+        shutil.rmtree(version_directory, ignore_errors=True)
+        os.rename(build_directory, version_directory)
+    except BaseException:
+        shutil.rmtree(build_directory, ignore_errors=True)
+        raise
+
+    # Mapped before the pointer names it, since from then on a concurrent ingest may delete it
+    dataset = ColumnarDataset(version_directory, dataset_schema)
+    previous = _read_json(os.path.join(dataset_directory, "current.json"))
+    _write_json(
+        os.path.join(dataset_directory, "current.json"),
+        {
+            "format": FORMAT_VERSION,
+            "directory": version,
+            "sha256": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "schema": _schema_signature(schema),
+        },
+    )
+    # Other processes keep reading the old version through the files they mapped when they opened it
+    if previous and previous.get("directory") not in (None, version):
+        shutil.rmtree(os.path.join(dataset_directory, previous["directory"]), ignore_errors=True)
+
+    return dataset
@@ -3,6 +3,10 @@ from pydantic import BaseModel, Field
 
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
 from ioa_observe.sdk.decorators import tool
+
+from agent_metrics import metrics
+from github_cache import GitHubResponseCache, cache_scope
+from singleflight import SingleFlight, single_flight
 # region GitHub Models
 
 
@@ -50,25 +54,36 @@ class GitHubSettings(BaseModel):
     token: str
 
 
+# Seconds a cached response is served before it is revalidated with GitHub
+CACHE_TTLS = {"user": 300, "repository": 300, "issues": 60, "issue_detail": 120}
+
+
 class GitHubPlugin:
-    def __init__(self, settings: GitHubSettings):
+    # Concurrent identical tool calls (e.g. from parallel A2A requests) share one upstream request
+    flights = SingleFlight()
+
+    def __init__(self, settings: GitHubSettings, cache: GitHubResponseCache | None = None):
         self.settings = settings
+        # Responses are shared with the other processes on the host through the cache, if there is one
+        self.cache = cache
+        self.cache_scope = cache_scope(settings.base_url, settings.token)
 
     @kernel_function
     @tool(name="get_user_profile", description="Get the GitHub user profile of the authenticated user")
+    @single_flight(flights)
     async def get_user_profile(self) -> "User":
         print("here....")
-        async with self.create_client() as client:
-            response = await self.make_request(client, "/user")
-            return User(**response)
+        response = await self.fetch("/user", CACHE_TTLS["user"])
+        return User(**response)
 
     @kernel_function
+    @single_flight(flights)
     async def get_repository(self, organization: str, repo: str) -> "Repo":
-        async with self.create_client() as client:
-            response = await self.make_request(client, f"/repos/{organization}/{repo}")
-            return Repo(**response)
+        response = await self.fetch(f"/repos/{organization}/{repo}", CACHE_TTLS["repository"])
+        return Repo(**response)
 
     @kernel_function
+    @single_flight(flights)
     async def get_issues(
         self,
         organization: str,
@@ -78,21 +93,35 @@ class GitHubPlugin:
         label: str = "",
         assignee: str = "",
     ) -> list["Issue"]:
-        async with self.create_client() as client:
-            path = f"/repos/{organization}/{repo}/issues?"
-            path = self.build_query(path, "state", state)
-            path = self.build_query(path, "assignee", assignee)
-            path = self.build_query(path, "labels", label)
-            path = self.build_query(path, "per_page", str(max_results) if max_results else "")
-            response = await self.make_request(client, path)
-            return [Issue(**issue) for issue in response]
+        path = f"/repos/{organization}/{repo}/issues?"
+        path = self.build_query(path, "state", state)
+        path = self.build_query(path, "assignee", assignee)
+        path = self.build_query(path, "labels", label)
+        path = self.build_query(path, "per_page", str(max_results) if max_results else "")
+        response = await self.fetch(path, CACHE_TTLS["issues"])
+        return [Issue(**issue) for issue in response]
 
     @kernel_function
+    @single_flight(flights)
     async def get_issue_detail(self, organization: str, repo: str, issue_id: int) -> "IssueDetail":
-        async with self.create_client() as client:
-            path = f"/repos/{organization}/{repo}/issues/{issue_id}"
-            response = await self.make_request(client, path)
-            return IssueDetail(**response)
+        path = f"/repos/{organization}/{repo}/issues/{issue_id}"
+        response = await self.fetch(path, CACHE_TTLS["issue_detail"])
+        return IssueDetail(**response)
+
+    async def fetch(self, path: str, ttl: float):
+        """GET a path of the API, through the shared cache when there is one."""
+        if self.cache is None:
+            async with self.create_client() as client:
+                return await self.make_request(client, path)
+
+        async def request(conditional_headers: dict[str, str]) -> httpx.Response:
+            # Only a miss or a revalidation pays for a client
+            print(f"REQUEST: {path}\n")
+            async with self.create_client() as client:
+                with metrics.timer("github.http"):
+                    return await client.get(path, headers=conditional_headers)
+
+        return await self.cache.get(f"{self.cache_scope}:{path}", request, ttl)
 
     def create_client(self) -> httpx.AsyncClient:
         headers = {
@@ -112,6 +141,7 @@ class GitHubPlugin:
     @staticmethod
     async def make_request(client: httpx.AsyncClient, path: str) -> dict:
         print(f"REQUEST: {path}\n")
-        response = await client.get(path)
+        with metrics.timer("github.http"):
+            response = await client.get(path)
         response.raise_for_status()
         return response.json()
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from agent_metrics import metrics
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".github_cache.sqlite3")
+DEFAULT_MAX_MB = 64
+# How long one process may refresh a key before another one may take over
+LEASE_SECONDS = 15.0
+# How often a process without anything to serve checks on the refresh another one is doing
+WAIT_INTERVAL = 0.05
+# Last access times are only rewritten this often, so hits rarely need a write
+TOUCH_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_access ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS refreshes (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+
+class GitHubResponseCache:
+    """GitHub responses shared by every process on the host, in one SQLite file.
+
+    A response is served as is until its TTL runs out, then revalidated with its ETag or
+    Last-Modified. GitHub answers 304 without counting it against the rate limit. Only the
+    process holding a key's refresh lease asks GitHub. The others serve the stale response
+    meanwhile, or wait for the new one when they have none. So upstream calls grow with the
+    distinct queries, not with the number of replicas. When the file outgrows max_bytes, the
+    least recently used responses are evicted.
+
+    SQLite calls run on the loop's default executor. The database is in WAL mode, so readers
+    never wait for the writer.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, lease_seconds: float = LEASE_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        if not os.path.exists(path):
+            # Responses can hold private data, so the file is only readable by its owner
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def __copy__(self) -> "GitHubResponseCache":
+        # One cache per file and process, so a copied plugin (Kernel.clone deep-copies plugins) shares it
+        return self
+
+    def __deepcopy__(self, memo) -> "GitHubResponseCache":
+        return self
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, since a connection must stay on the thread that opened it
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def lookup(self, key: str) -> CachedResponse | None:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT body, etag, last_modified, expires_at, accessed_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[4] > TOUCH_SECONDS:
+            connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return CachedResponse(row[0], row[1], row[2], row[3])
+
+    def acquire(self, key: str, owner: str) -> bool:
+        """Take the key's refresh lease, unless another owner holds one that has not expired."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO refreshes (key, owner, until) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, until = excluded.until WHERE until < ?",
+            (key, owner, now + self.lease_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str):
+        self._connection().execute("DELETE FROM refreshes WHERE key = ? AND owner = ?", (key, owner))
+
+    def store(self, key: str, body: bytes, etag: str | None, last_modified: str | None, ttl: float):
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, body, etag, last_modified, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now + ttl, now, len(body)),
+            )
+            self._evict(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def renew(self, key: str, ttl: float):
+        """Serve a response that GitHub confirmed unchanged for another TTL."""
+        now = time.time()
+        self._connection().execute(
+            "UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?", (now + ttl, now, key)
+        )
+
+    def _evict(self, connection: sqlite3.Connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.max_bytes:
+            victims = connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not victims:
+                break
+            for key, size in victims:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                metrics.increment("github.cache.evictions")
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    async def get(
+        self, key: str, request: Callable[[dict[str, str]], Awaitable[httpx.Response]], ttl: float
+    ) -> Any:
+        """The decoded JSON for a key, from the cache or from `request(conditional_headers)`."""
+        entry = await asyncio.to_thread(self.lookup, key)
+        if entry is not None and entry.fresh:
+            metrics.increment("github.cache", result="hit")
+            return json.loads(entry.body)
+
+        owner = uuid.uuid4().hex
+        while not await asyncio.to_thread(self.acquire, key, owner):
+            if entry is not None:
+                # Another process is refreshing it, the stale response will do until then
+                metrics.increment("github.cache", result="stale")
+                return json.loads(entry.body)
+            await asyncio.sleep(WAIT_INTERVAL)
+            entry = await asyncio.to_thread(self.lookup, key)
+            if entry is not None and entry.fresh:
+                metrics.increment("github.cache", result="waited")
+                return json.loads(entry.body)
+
+        try:
+            # The previous lease holder may have refreshed it since the lookup
+            latest = await asyncio.to_thread(self.lookup, key)
+            if latest is not None and latest.fresh:
+                metrics.increment("github.cache", result="hit")
+                return json.loads(latest.body)
+            return await self._refresh(key, latest or entry, request, ttl)
+        finally:
+            await asyncio.to_thread(self.release, key, owner)
+
+    async def _refresh(self, key: str, entry: CachedResponse | None, request, ttl: float) -> Any:
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            response = await request(headers)
+        except httpx.HTTPError:
+            if entry is None:
+                raise
+            metrics.increment("github.cache", result="stale_on_error")
+            return json.loads(entry.body)
+
+        if response.status_code == 304 and entry is not None:
+            await asyncio.to_thread(self.renew, key, ttl)
+            metrics.increment("github.cache", result="revalidated")
+            return json.loads(entry.body)
+        if response.status_code >= 500 and entry is not None:
+            metrics.increment("github.cache", result="stale_on_error")
+            return json.loads(entry.body)
+        response.raise_for_status()
+
+        body = response.content
+        await asyncio.to_thread(
+            self.store, key, body, response.headers.get("etag"), response.headers.get("last-modified"), ttl
+        )
+        metrics.increment("github.cache", result="miss")
+        return json.loads(body)
+
+
+def cache_scope(base_url: str, token: str | None) -> str:
+    """Key prefix for one API root and token, since responses depend on who is asking."""
+    return hashlib.sha256(f"{base_url}\0{token or ''}".encode()).hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def shared_github_cache() -> GitHubResponseCache | None:
+    """The host-wide cache at GITHUB_CACHE_PATH (GITHUB_CACHE_MAX_MB), or None when the path is "off"."""
+    path = os.getenv("GITHUB_CACHE_PATH", DEFAULT_PATH)
+    if path.lower() == "off":
+        return None
+    return GitHubResponseCache(path, max_bytes=int(float(os.getenv("GITHUB_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024))
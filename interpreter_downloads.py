@@ -0,0 +1,96 @@
+import asyncio
+import mimetypes
+import os
+
+from openai import AsyncOpenAI
+
+DOWNLOAD_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_DOWNLOAD_CONCURRENCY = 4
+CHUNK_SIZE = 1 << 16
+
+# Common code interpreter outputs, checked before the mimetypes table, which is platform dependent
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/svg+xml": ".svg",
+    "text/csv": ".csv",
+    "text/plain": ".txt",
+    "application/json": ".json",
+    "application/pdf": ".pdf",
+    "application/zip": ".zip",
+}
+
+# Used when the service only reports application/octet-stream
+SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"\xff\xd8\xff": ".jpg",
+    b"GIF8": ".gif",
+    b"%PDF": ".pdf",
+    b"PK\x03\x04": ".zip",
+}
+
+
+def file_extension(content_type: str | None, head: bytes = b"") -> str:
+    """Extension for a downloaded file from its content type, falling back to its leading bytes."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in EXTENSIONS:
+        return EXTENSIONS[media_type]
+    if media_type and media_type != "application/octet-stream":
+        guessed = mimetypes.guess_extension(media_type)
+        if guessed:
+            return guessed
+    for signature, extension in SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return ".bin"
+
+
+async def download_file(client: AsyncOpenAI, file_id: str, directory: str = DOWNLOAD_DIRECTORY) -> str:
+    """Stream a file to disk in chunks and return its path.
+
+    The body is never held in memory as a whole, and file writes run in a worker thread so a
+    large artifact does not stall the event loop. The file gets its final name, with the
+    extension taken from the content type, only once it is complete.
+    """
+    part_path = os.path.join(directory, f"{file_id}.part")
+    async with client.files.with_streaming_response.content(file_id) as response:
+        file = await asyncio.to_thread(open, part_path, "wb")
+        head = b""
+        try:
+            async for chunk in response.iter_bytes(CHUNK_SIZE):
+                head = head or chunk
+                await asyncio.to_thread(file.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(file.close)
+            await asyncio.to_thread(os.remove, part_path)
+            raise
+        await asyncio.to_thread(file.close)
+
+    file_path = os.path.join(directory, f"{file_id}{file_extension(response.headers.get('content-type'), head)}")
+    await asyncio.to_thread(os.replace, part_path, file_path)
+    return file_path
+
+
+async def download_files(
+    client: AsyncOpenAI,
+    file_ids: list[str],
+    directory: str = DOWNLOAD_DIRECTORY,
+    max_concurrency: int | None = None,
+) -> dict[str, str | BaseException]:
+    """Download files concurrently with at most DOWNLOAD_CONCURRENCY transfers at a time.
+
+    Returns the saved path, or the error, for each distinct file id in the order given.
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("DOWNLOAD_CONCURRENCY", DEFAULT_DOWNLOAD_CONCURRENCY))
+    semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+    async def bounded(file_id: str) -> str:
+        async with semaphore:
+            return await download_file(client, file_id, directory)
+
+    unique_ids = list(dict.fromkeys(file_ids))
+    results = await asyncio.gather(*[bounded(file_id) for file_id in unique_ids], return_exceptions=True)
+    return dict(zip(unique_ids, results))
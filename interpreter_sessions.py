@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any
+
+from openai import AsyncOpenAI, NotFoundError
+from semantic_kernel.agents import AssistantAgentThread, OpenAIAssistantAgent
+
+from interpreter_uploads import UploadManifest, get_or_create_assistant, upload_files
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPARE_THREADS = 1
+REAP_INTERVAL = 300
+
+# How long each kind of remote resource may live without being refreshed before it is reaped
+LEASE_TTL = {
+    "assistant": 7 * 24 * 3600,
+    "spare_thread": 24 * 3600,
+    "thread": 24 * 3600,
+    "file": 3600,
+}
+
+
+def _process_alive(pid: int | None) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+async def _delete_remote(client: AsyncOpenAI, kind: str, resource_id: str):
+    try:
+        if kind in ("thread", "spare_thread"):
+            await client.beta.threads.delete(resource_id)
+        elif kind == "file":
+            await client.files.delete(resource_id)
+        elif kind == "assistant":
+            await client.beta.assistants.delete(resource_id)
+    except NotFoundError:
+        # Already gone, which is what the reaper wants
+        pass
+
+
+class InterpreterSessionManager:
+    """Keeps code interpreter agents and threads warm across turns and processes.
+
+    One agent is built per dataset (the set of uploaded files) and reused for every turn.
+    Spare threads are created ahead of time, so a conversation starts on an existing thread,
+    and unused spares are handed to the next process on close. Every remote resource this
+    class creates is leased in the UploadManifest, and renewed while this run holds it. The
+    reaper deletes leases that expired or whose owning process has exited, so a crashed run
+    does not leak threads or files.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        manifest: UploadManifest,
+        *,
+        model: str,
+        name: str,
+        instructions: str,
+        plugins: list[Any] | None = None,
+        agent_class: type[OpenAIAssistantAgent] = OpenAIAssistantAgent,
+        spare_threads: int = DEFAULT_SPARE_THREADS,
+        reap_interval: float = REAP_INTERVAL,
+    ):
+        self.client = client
+        self.manifest = manifest
+        self.model = model
+        self.name = name
+        self.instructions = instructions
+        self.plugins = plugins or []
+        self.agent_class = agent_class
+        self.spare_threads = spare_threads
+        self.reap_interval = reap_interval
+        self._agents: dict[tuple, OpenAIAssistantAgent] = {}
+        self._agent_lock = asyncio.Lock()
+        self._spares: list[AssistantAgentThread] = []
+        self._active: dict[str, AssistantAgentThread] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._reaper: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "InterpreterSessionManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _lease(self, resource_id: str, kind: str, owned: bool = True):
+        self.manifest.leases[resource_id] = {
+            "kind": kind,
+            "pid": os.getpid() if owned else None,
+            "expires": time.time() + LEASE_TTL[kind],
+        }
+
+    def _release(self, resource_id: str):
+        self.manifest.leases.pop(resource_id, None)
+
+    def _save(self):
+        # Merges this run's lease changes into the latest manifest, see UploadManifest
+        self.manifest.save()
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def start(self):
+        """Reap orphaned resources, adopt spare threads left by earlier runs and start the reaper."""
+        await self.reap()
+        # Spares are claimed under the manifest's lock, on its latest copy, so two runs starting
+        # together never adopt the same thread
+        with self.manifest.locked():
+            for resource_id, lease in list(self.manifest.leases.items()):
+                unowned = lease.get("pid") is None
+                if lease["kind"] == "spare_thread" and unowned and len(self._spares) < self.spare_threads:
+                    self._spares.append(AssistantAgentThread(self.client, thread_id=resource_id))
+                    self._lease(resource_id, "spare_thread")
+        self._spawn(self._fill_spares())
+        if self.reap_interval > 0:
+            self._reaper = asyncio.create_task(self._reap_periodically())
+
+    async def agent(self, paths: list[str]) -> OpenAIAssistantAgent:
+        """The agent for a dataset, uploading files and creating the assistant only on first use."""
+        key = tuple((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in paths)
+        async with self._agent_lock:
+            if key not in self._agents:
+                file_ids = await upload_files(self.client, paths, self.manifest)
+                definition = await get_or_create_assistant(
+                    self.client,
+                    self.manifest,
+                    model=self.model,
+                    name=self.name,
+                    instructions=self.instructions,
+                    file_ids=file_ids,
+                )
+                # Assistants are shared by every run, so their lease only expires when unused
+                self._lease(definition.id, "assistant", owned=False)
+                self._save()
+                self._agents[key] = self.agent_class(client=self.client, definition=definition, plugins=self.plugins)
+            return self._agents[key]
+
+    async def _new_thread(self) -> AssistantAgentThread:
+        response = await self.client.beta.threads.create()
+        self._lease(response.id, "spare_thread")
+        return AssistantAgentThread(self.client, thread_id=response.id)
+
+    async def _fill_spares(self):
+        missing = self.spare_threads - len(self._spares)
+        if missing <= 0:
+            return
+        try:
+            self._spares.extend(await asyncio.gather(*[self._new_thread() for _ in range(missing)]))
+            self._save()
+        except Exception as ex:
+            logger.warning(f"Could not create spare threads: {ex}")
+
+    async def acquire_thread(self) -> AssistantAgentThread:
+        """A thread for a new conversation, taken from the spares when one is ready."""
+        thread = self._spares.pop() if self._spares else await self._new_thread()
+        self._lease(thread.id, "thread")
+        self._active[thread.id] = thread
+        self._save()
+        self._spawn(self._fill_spares())
+        return thread
+
+    async def release_thread(self, thread: AssistantAgentThread):
+        """Delete a finished conversation's thread."""
+        if thread.id is None:
+            return
+        self._active.pop(thread.id, None)
+        await _delete_remote(self.client, "thread", thread.id)
+        self._release(thread.id)
+        self._save()
+
+    def track_files(self, file_ids: list[str]):
+        """Lease files generated by the assistant so they are deleted even if this run crashes."""
+        for file_id in file_ids:
+            self._lease(file_id, "file")
+        if file_ids:
+            self._save()
+
+    async def delete_files(self, file_ids: list[str]):
+        await asyncio.gather(*[_delete_remote(self.client, "file", file_id) for file_id in file_ids])
+        for file_id in file_ids:
+            self._release(file_id)
+        if file_ids:
+            self._save()
+
+    def renew(self):
+        """Extend the leases this run holds once half their TTL has passed, so nothing in use expires."""
+        now = time.time()
+        expiring = [
+            (resource_id, lease["kind"])
+            for resource_id, lease in self.manifest.leases.items()
+            if lease.get("pid") == os.getpid() and lease["expires"] - now < LEASE_TTL[lease["kind"]] / 2
+        ]
+        for resource_id, kind in expiring:
+            self._lease(resource_id, kind)
+        if expiring:
+            self._save()
+
+    async def reap(self) -> int:
+        """Delete leased resources that expired or whose owning process is gone. Returns how many."""
+        now = time.time()
+        orphaned = [
+            (resource_id, lease)
+            for resource_id, lease in list(self.manifest.leases.items())
+            if lease.get("pid") != os.getpid()
+            and (lease["expires"] < now or (lease.get("pid") is not None and not _process_alive(lease["pid"])))
+        ]
+        if not orphaned:
+            return 0
+
+        results = await asyncio.gather(
+            *[_delete_remote(self.client, lease["kind"], resource_id) for resource_id, lease in orphaned],
+            return_exceptions=True,
+        )
+        reaped = 0
+        for (resource_id, lease), result in zip(orphaned, results):
+            if isinstance(result, Exception):
+                # Keep the lease and try again on the next pass
+                logger.warning(f"Could not reap {lease['kind']} {resource_id}: {result}")
+                continue
+            self._release(resource_id)
+            if lease["kind"] == "assistant":
+                self.manifest.assistants = {
+                    key: value for key, value in self.manifest.assistants.items() if value != resource_id
+                }
+            reaped += 1
+        self._save()
+        return reaped
+
+    async def _reap_periodically(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                self.renew()
+                await self.reap()
+            except Exception as ex:
+                logger.warning(f"Reaper pass failed: {ex}")
+
+    async def close(self):
+        """Delete this run's threads and files and hand the spare threads to the next run."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        owned = [
+            (resource_id, lease)
+            for resource_id, lease in self.manifest.leases.items()
+            if lease.get("pid") == os.getpid() and lease["kind"] in ("thread", "file")
+        ]
+        results = await asyncio.gather(
+            *[_delete_remote(self.client, lease["kind"], resource_id) for resource_id, lease in owned],
+            return_exceptions=True,
+        )
+        for (resource_id, _), result in zip(owned, results):
+            # A failed delete keeps its lease, and the reaper of a later run retries it
+            if not isinstance(result, Exception):
+                self._release(resource_id)
+        self._active.clear()
+
+        for thread in self._spares:
+            self._lease(thread.id, "spare_thread", owned=False)
+        self._spares.clear()
+        self._save()
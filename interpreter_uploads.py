@@ -0,0 +1,178 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from openai import AsyncOpenAI, NotFoundError
+from semantic_kernel.agents import OpenAIAssistantAgent
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs sharing the manifest are not serialized
+    fcntl = None
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".interpreter_manifest.json")
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+_SECTIONS = ("files", "assistants", "leases")
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content, read in chunks so large datasets are not loaded at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadManifest:
+    """Local record of the files and assistant definitions already created on the service.
+
+    Files are keyed by content hash, assistants by a hash of their full definition, so a run
+    with unchanged datasets and instructions reuses what the previous run created. Leases record
+    the other remote resources a run created (threads, generated files) so they can be reaped.
+
+    Runs share the manifest. Saving applies only the entries this copy added, changed or removed
+    since it was loaded to the latest copy on disk, under a lock, so the other runs' changes are
+    kept and an entry one of them removed is not brought back.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.files: dict[str, dict[str, Any]] = {}
+        self.assistants: dict[str, str] = {}
+        self.leases: dict[str, dict[str, Any]] = {}
+        self._loaded: dict[str, dict[str, Any]] = {section: {} for section in _SECTIONS}
+        self.load()
+
+    def _read(self) -> dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _snapshot(self):
+        self._loaded = copy.deepcopy({section: getattr(self, section) for section in _SECTIONS})
+
+    def load(self):
+        data = self._read()
+        for section in _SECTIONS:
+            setattr(self, section, data.get(section, {}))
+        self._snapshot()
+
+    @contextmanager
+    def locked(self):
+        """Hold the manifest's lock with this copy's changes merged into the latest one, and save on exit."""
+        with open(f"{self.path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            latest = self._read()
+            for section in _SECTIONS:
+                loaded, current = self._loaded[section], getattr(self, section)
+                merged = dict(latest.get(section, {}))
+                for key in loaded.keys() - current.keys():
+                    merged.pop(key, None)
+                merged.update({key: value for key, value in current.items() if loaded.get(key) != value})
+                setattr(self, section, merged)
+            yield self
+            self._write()
+            self._snapshot()
+
+    def save(self):
+        with self.locked():
+            pass
+
+    def _write(self):
+        # Write to a temporary file first so an interrupted run never leaves a truncated manifest
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({section: getattr(self, section) for section in _SECTIONS}, file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+async def _remote_file_exists(client: AsyncOpenAI, file_id: str) -> bool:
+    try:
+        await client.files.retrieve(file_id)
+        return True
+    except NotFoundError:
+        return False
+
+
+async def _upload_file(client: AsyncOpenAI, path: str, digest: str, manifest: UploadManifest) -> str:
+    # A Path is read by the client without blocking the event loop
+    file = await client.files.create(file=Path(path), purpose="assistants")
+    manifest.files[digest] = {"file_id": file.id, "name": os.path.basename(path), "size": os.path.getsize(path)}
+    return file.id
+
+
+async def upload_files(client: AsyncOpenAI, paths: list[str], manifest: UploadManifest) -> list[str]:
+    """Return a file id for each path, uploading only files whose content is not in the manifest.
+
+    Files are hashed off the event loop, cached ids are checked against the service concurrently,
+    and missing or changed files are uploaded concurrently.
+    """
+    digests = await asyncio.gather(*[asyncio.to_thread(file_digest, path) for path in paths])
+
+    cached = {digest: manifest.files[digest]["file_id"] for digest in set(digests) if digest in manifest.files}
+    exists = await asyncio.gather(*[_remote_file_exists(client, file_id) for file_id in cached.values()])
+    for digest, found in zip(list(cached), exists):
+        if not found:
+            del cached[digest]
+            manifest.files.pop(digest, None)
+
+    # Identical content under several paths is uploaded once
+    pending = {digest: path for path, digest in zip(paths, digests) if digest not in cached}
+    uploaded = await asyncio.gather(
+        *[_upload_file(client, path, digest, manifest) for digest, path in pending.items()]
+    )
+    cached.update(zip(pending, uploaded))
+
+    if pending:
+        manifest.save()
+    return [cached[digest] for digest in digests]
+
+
+def _definition_key(**definition: Any) -> str:
+    encoded = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+async def get_or_create_assistant(
+    client: AsyncOpenAI,
+    manifest: UploadManifest,
+    *,
+    model: str,
+    name: str,
+    instructions: str,
+    file_ids: list[str],
+):
+    """Return a code interpreter assistant definition, reusing the recorded one when nothing changed."""
+    key = _definition_key(model=model, name=name, instructions=instructions, file_ids=sorted(file_ids))
+
+    assistant_id = manifest.assistants.get(key)
+    if assistant_id:
+        try:
+            return await client.beta.assistants.retrieve(assistant_id)
+        except NotFoundError:
+            del manifest.assistants[key]
+
+    code_interpreter_tools, code_interpreter_tool_resources = OpenAIAssistantAgent.configure_code_interpreter_tool(
+        file_ids=file_ids
+    )
+    definition = await client.beta.assistants.create(
+        model=model,
+        instructions=instructions,
+        name=name,
+        tools=code_interpreter_tools,
+        tool_resources=code_interpreter_tool_resources,
+    )
+    manifest.assistants[key] = definition.id
+    manifest.save()
+    return definition
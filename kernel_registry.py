@@ -0,0 +1,142 @@
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Callable
+
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.function_calling_utils import kernel_function_metadata_to_function_call_format
+from semantic_kernel.functions.kernel_function_metadata import KernelFunctionMetadata
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_tool_schema_lock = threading.Lock()
+_tool_schemas: dict[tuple[int, ...], tuple[list[KernelFunctionMetadata], list[dict[str, Any]]]] = {}
+
+
+def cached_tool_schemas(functions: list[KernelFunctionMetadata]) -> list[dict[str, Any]]:
+    """The tool JSON schemas for a list of functions, serialized once per distinct list.
+
+    Function metadata is immutable once a plugin is added, so the key is the identity of the
+    metadata objects. The cache entry keeps them alive, which keeps those identities unique.
+    """
+    key = tuple(id(function) for function in functions)
+    cached = _tool_schemas.get(key)
+    if cached is None:
+        with _tool_schema_lock:
+            cached = _tool_schemas.setdefault(
+                key, (list(functions), [kernel_function_metadata_to_function_call_format(f) for f in functions])
+            )
+    return cached[1]
+
+
+def update_settings_with_cached_tools(function_choice_configuration, settings, type) -> None:
+    """Drop-in for Semantic Kernel's settings callback that reuses cached tool schemas."""
+    if (
+        function_choice_configuration.available_functions
+        and hasattr(settings, "tool_choice")
+        and hasattr(settings, "tools")
+    ):
+        settings.tool_choice = type
+        settings.tools = list(cached_tool_schemas(function_choice_configuration.available_functions))
+
+
+def _lights_plugin():
+    from lights_plugin import LightsPlugin
+
+    return LightsPlugin()
+
+
+def _github_plugin():
+    from github import GitHubPlugin, GitHubSettings
+    from github_cache import shared_github_cache
+
+    settings = GitHubSettings(token=os.getenv("GITHUB_ACCESS_TOKEN"))  # nosec
+    # Another API root, such as GitHub Enterprise or the benchmarks' stub
+    if os.getenv("GITHUB_API_URL"):
+        settings.base_url = os.environ["GITHUB_API_URL"].rstrip("/")
+    return GitHubPlugin(settings, cache=shared_github_cache())
+
+
+def _population_plugin():
+    from population_plugin import PopulationPlugin
+
+    return PopulationPlugin()
+
+
+# Plugins every entry point can ask for by name, created on first use
+PLUGINS: dict[str, Callable[[], Any]] = {
+    "Lights": _lights_plugin,
+    "GithubPlugin": _github_plugin,
+    "Population": _population_plugin,
+}
+
+
+@lru_cache(maxsize=None)
+def plugin(name: str) -> Any:
+    """The process-wide instance of a registered plugin, so state and connections are shared."""
+    if name not in PLUGINS:
+        raise ValueError(f"Unknown plugin {name!r}, expected one of {', '.join(PLUGINS)}")
+    return PLUGINS[name]()
+
+
+@lru_cache(maxsize=None)
+def kernel_template(service_id: str, plugins: tuple[str, ...], parallel_tools: bool = False) -> Kernel:
+    """Build a fully configured kernel once per configuration.
+
+    The service is created, plugin reflection runs and the filters are registered here, at
+    startup, instead of on the request path. Use `get_kernel` for a kernel to run requests on.
+    """
+    from agent_metrics import TimedOpenAIChatCompletion, instrument_kernel
+    from openai_client import shared_openai_client
+    from parallel_tools import enable_parallel_tool_calls
+    from server_runtime import offload_sync_functions
+
+    kernel = Kernel()
+
+    # Add OpenAI chat completion, on the connection pool every service in the process shares
+    kernel.add_service(
+        TimedOpenAIChatCompletion(
+            ai_model_id=DEFAULT_MODEL,
+            service_id=service_id,
+            async_client=shared_openai_client(),
+        )
+    )
+
+    for name in plugins:
+        kernel.add_plugin(plugin(name), plugin_name=name)
+    # Sync plugin functions that turn out to be slow run on a thread pool instead of the event loop
+    offload_sync_functions(kernel)
+
+    if parallel_tools:
+        # Run the tool calls of a single model response as a bounded, ordered batch
+        enable_parallel_tool_calls(kernel)
+
+    # Record the duration of every tool invocation
+    instrument_kernel(kernel)
+
+    # Serialize the tool schemas now so the first request does not pay for it
+    cached_tool_schemas(kernel.get_full_list_of_function_metadata())
+    return kernel
+
+
+def clone_kernel(kernel: Kernel) -> Kernel:
+    """A kernel that shares the plugins and services of another but has its own collections.
+
+    Kernel.clone deep-copies every plugin, including plugin state such as the lights and HTTP
+    clients. Here the plugin objects are shared, and only the containers are copied, so a
+    request can add or remove plugins and filters without touching the template.
+    """
+    return Kernel.model_construct(
+        retry_mechanism=kernel.retry_mechanism,
+        plugins=dict(kernel.plugins),
+        services=dict(kernel.services),
+        ai_service_selector=kernel.ai_service_selector,
+        function_invocation_filters=list(kernel.function_invocation_filters),
+        prompt_rendering_filters=list(kernel.prompt_rendering_filters),
+        auto_function_invocation_filters=list(kernel.auto_function_invocation_filters),
+    )
+
+
+def get_kernel(service_id: str, plugins: tuple[str, ...] = (), parallel_tools: bool = False) -> Kernel:
+    """A per-request kernel cloned from the shared template for this configuration."""
+    return clone_kernel(kernel_template(service_id, tuple(plugins), parallel_tools))
@@ -0,0 +1,180 @@
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+
+# Lights listed in the prompt at most, however many the home has
+MAX_CANDIDATES = 5
+
+# Dice similarity of character trigrams above which a word counts as a misspelled name word
+MIN_SIMILARITY = 0.5
+
+# Name words shared by more lights than this only rank the lights other words already found
+COMMON_WORD_LIGHTS = 64
+
+# Device words that name no light in particular, so they only rank the lights other words found
+GENERIC_WORDS = frozenset("light lights lamp lamps bulb bulbs fixture fixtures".split())
+
+# Command words that never identify a light
+STOPWORDS = frozenset(
+    "a an the and or to of in on off for me my i you your is are be can please with at by it this that "
+    "turn switch set make put keep leave all every any some which what whether now state status show "
+    "tell check currently".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+# "light 2", "id 2", "#2"
+_ID = re.compile(r"(?:\bid\s*:?\s*|#|\blights?\s+)(\d+)\b", re.IGNORECASE)
+_ALL = re.compile(r"\b(?:all|every|each|everything)\b", re.IGNORECASE)
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f" {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class LightMatch:
+    light: dict
+    score: float
+
+
+class LightCatalog:
+    """Resolves the lights a request talks about from their names, without asking the model.
+
+    Light names are indexed by word, and their words by character trigram, so a misspelled
+    or plural word ("chandeleir", "lamps") still finds its light. A lookup only touches the
+    postings of the request's own words and trigrams. The catalog holds the light dicts
+    themselves, so their on/off state is always current. It re-indexes when lights are added
+    or removed; call refresh() after renaming one.
+    """
+
+    def __init__(self, lights: list[dict]):
+        self.lights = lights
+        self._by_id: dict[int, dict] = {}
+        self._word_lights: dict[str, set[int]] = {}
+        self._trigram_words: dict[str, set[str]] = {}
+        self._word_trigrams: dict[str, set[str]] = {}
+        self._indexed = -1
+        self.refresh()
+
+    def refresh(self):
+        word_lights: dict[str, set[int]] = defaultdict(set)
+        for index, light in enumerate(self.lights):
+            for word in _words(light["name"]):
+                word_lights[word].add(index)
+        trigram_words: dict[str, set[str]] = defaultdict(set)
+        word_trigrams = {word: _trigrams(word) for word in word_lights}
+        for word, trigrams in word_trigrams.items():
+            for trigram in trigrams:
+                trigram_words[trigram].add(word)
+
+        self._by_id = {light["id"]: light for light in self.lights}
+        self._word_lights = dict(word_lights)
+        self._trigram_words = dict(trigram_words)
+        self._word_trigrams = word_trigrams
+        self._indexed = len(self.lights)
+
+    def _similar_words(self, word: str) -> dict[str, float]:
+        """Name words equal or close to a request word, with their similarity."""
+        if word in self._word_lights:
+            return {word: 1.0}
+        trigrams = _trigrams(word)
+        shared: dict[str, int] = defaultdict(int)
+        for trigram in trigrams:
+            for candidate in self._trigram_words.get(trigram, ()):
+                shared[candidate] += 1
+        similar = {}
+        for candidate, count in shared.items():
+            similarity = 2 * count / (len(trigrams) + len(self._word_trigrams[candidate]))
+            if similarity >= MIN_SIMILARITY:
+                similar[candidate] = similarity
+        return similar
+
+    def match(self, text: str, limit: int = MAX_CANDIDATES) -> list[LightMatch]:
+        """The lights a request names or refers to by id, best first and at most `limit`."""
+        return self.resolve(text, limit)[0]
+
+    def resolve(self, text: str, limit: int = MAX_CANDIDATES) -> tuple[list[LightMatch], int]:
+        """The best `limit` lights a request names, and how many lights it names in all.
+
+        A word found in at most `limit` names singles those lights out. When the request has
+        such a word or an id, lights that only share broader words with it ("kitchen") are left
+        out. Otherwise the lights sharing the most broad words ("kitchen pendant") come first.
+        Device words ("light", "lamp") never find a light by themselves, and a request for an
+        id that does not exist matches nothing else rather than a light it did not name.
+        """
+        if self._indexed != len(self.lights):
+            self.refresh()
+
+        matches: dict[int, LightMatch] = {}
+        for light_id in _ID.findall(text):
+            light = self._by_id.get(int(light_id))
+            if light is None:
+                return list(matches.values()), len(matches)
+            matches[light["id"]] = LightMatch(light, math.inf)
+
+        weighted: list[tuple[str, float]] = []
+        for word in set(_words(text)) - STOPWORDS:
+            for name_word, similarity in self._similar_words(word).items():
+                # Words found in few light names say more about which light is meant
+                idf = math.log(1 + len(self.lights) / len(self._word_lights[name_word]))
+                weighted.append((name_word, similarity * idf))
+
+        # Rare words first and device words last, so those can be limited to ranking the lights already found
+        weighted.sort(key=lambda entry: (entry[0] in GENERIC_WORDS, len(self._word_lights[entry[0]])))
+        scores: dict[int, float] = defaultdict(float)
+        singled_out: set[int] = set()
+        for name_word, weight in weighted:
+            indexes = self._word_lights[name_word]
+            generic = name_word in GENERIC_WORDS
+            if len(indexes) <= limit and not generic:
+                singled_out.update(indexes)
+            if generic or (len(indexes) > COMMON_WORD_LIGHTS and scores):
+                for index in scores:
+                    if index in indexes:
+                        scores[index] += weight
+            else:
+                for index in indexes:
+                    scores[index] += weight
+
+        if singled_out or matches:
+            scores = {index: score for index, score in scores.items() if index in singled_out}
+        total = len(matches) + sum(self.lights[index]["id"] not in matches for index in scores)
+        for index, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            if len(matches) >= limit:
+                break
+            light = self.lights[index]
+            matches.setdefault(light["id"], LightMatch(light, score))
+        return list(matches.values()), total
+
+
+def describe_lights(lights: list[dict]) -> str:
+    return ", ".join(f"{light['name']} (id: {light['id']}, {'on' if light['is_on'] else 'off'})" for light in lights)
+
+
+def light_context(catalog: LightCatalog, text: str, limit: int = MAX_CANDIDATES) -> dict[str, str]:
+    """Context message values for a lights request: only the lights it names, so the prompt stays small.
+
+    A home with at most `limit` lights is always listed in full. In a larger one, the whole
+    list is left to the get_lights function when the request names no light, asks about all,
+    or names more lights than `limit` ("the kitchen lights").
+    """
+    if len(catalog.lights) <= limit:
+        return {"lights": describe_lights(catalog.lights)}
+    matches, total = catalog.resolve(text, limit)
+    context = {}
+    if matches:
+        context["lights_named_in_the_request"] = describe_lights([match.light for match in matches])
+    if total > len(matches):
+        context["lights"] = (
+            f"the request names {total} lights, only the best {len(matches)} are listed; "
+            f"{len(catalog.lights)} in total; call get_lights to list them"
+        )
+    elif not matches or _ALL.search(text) is not None:
+        context["lights"] = f"{len(catalog.lights)} in total; call get_lights to list them"
+    return context
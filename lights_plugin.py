@@ -1,13 +1,43 @@
+import contextvars
+import copy
+from contextlib import contextmanager
 from typing import Annotated
 from semantic_kernel.functions import kernel_function
 from ioa_observe.sdk.decorators import tool
 
+DEFAULT_LIGHTS = [
+    {"id": 1, "name": "Table Lamp", "is_on": False},
+    {"id": 2, "name": "Porch light", "is_on": False},
+    {"id": 3, "name": "Chandelier", "is_on": True},
+]
+
+# Lights of the current task when it was given its own with own_lights()
+_task_lights: contextvars.ContextVar[list[dict] | None] = contextvars.ContextVar("task_lights", default=None)
+
+
+@contextmanager
+def own_lights(lights: list[dict] | None = None):
+    """Give the code in the block, and the tasks and threads it starts, lights of its own.
+
+    Every LightsPlugin reads and changes these instead of its shared ones, so e.g. concurrent
+    batch items run on the same registered plugin without seeing each other's changes.
+    """
+    token = _task_lights.set(copy.deepcopy(DEFAULT_LIGHTS if lights is None else lights))
+    try:
+        yield
+    finally:
+        _task_lights.reset(token)
+
+
 class LightsPlugin:
-    lights = [
-        {"id": 1, "name": "Table Lamp", "is_on": False},
-        {"id": 2, "name": "Porch light", "is_on": False},
-        {"id": 3, "name": "Chandelier", "is_on": True},
-    ]
+    def __init__(self, lights: list[dict] | None = None):
+        # Every instance has lights of its own, starting from the defaults
+        self._lights = copy.deepcopy(DEFAULT_LIGHTS if lights is None else lights)
+
+    @property
+    def lights(self) -> list[dict]:
+        task_lights = _task_lights.get()
+        return self._lights if task_lights is None else task_lights
 
     @kernel_function(
         name="get_lights",
@@ -3,7 +3,6 @@ import asyncio
 from semantic_kernel import Kernel
 from semantic_kernel.utils.logging import setup_logging
 from semantic_kernel.functions import kernel_function
-from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
 from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
 from semantic_kernel.contents.chat_history import ChatHistory
@@ -12,65 +11,188 @@ from semantic_kernel.functions.kernel_arguments import KernelArguments
 from semantic_kernel.connectors.ai.open_ai.prompt_execution_settings.azure_chat_prompt_execution_settings import (
     AzureChatPromptExecutionSettings,
 )
+import argparse
+import json
 import os
 import logging
+import time
 
-from lights_plugin import LightsPlugin
+from agent_metrics import metrics
+from async_input import ainput
+from kernel_registry import get_kernel, kernel_template
+from lights_plugin import own_lights
+from openai_client import close_shared_client, warm_up
 
 
-async def main():
-    # Initialize the kernel
-    kernel = Kernel()
-
-    # Add OpenAI chat completion
-    chat_completion = OpenAIChatCompletion(
-        api_key=os.environ["OPENAI_API_KEY"],
-        ai_model_id="gpt-4o-mini",
-    )
-    kernel.add_service(chat_completion)
+DEFAULT_BATCH_CONCURRENCY = 8
 
-    # Set the logging level for  semantic_kernel.kernel to DEBUG.
-    setup_logging()
-    logging.getLogger("kernel").setLevel(logging.DEBUG)
-
-    # Add a plugin (the LightsPlugin class is defined below)
-    kernel.add_plugin(
-        LightsPlugin(),
-        plugin_name="Lights",
-    )
 
+def execution_settings() -> AzureChatPromptExecutionSettings:
     # Enable planning
-    execution_settings = AzureChatPromptExecutionSettings()
-    execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
-
-    # Create a history of the conversation
-    history = ChatHistory()
-
-    # Initiate a back-and-forth chat
-    userInput = None
-    while True:
-        # Collect user input
-        userInput = input("User > ")
-
-        # Terminate the loop if the user says "exit"
-        if userInput == "exit":
-            break
-
-        # Add user input to the history
-        history.add_user_message(userInput)
-
-        # Get the response from the AI
-        result = await chat_completion.get_chat_message_content(
-            chat_history=history,
-            settings=execution_settings,
-            kernel=kernel,
-        )
+    settings = AzureChatPromptExecutionSettings()
+    settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
+    return settings
+
+
+async def chat():
+    # Get a kernel with the OpenAI chat completion service and the LightsPlugin from the shared registry
+    kernel = get_kernel("cli", ("Lights",))
+    chat_completion = kernel.get_service("cli")
+    # Open the OpenAI connections while the user types the first prompt
+    warming = asyncio.create_task(warm_up())
+
+    try:
+        # Set the logging level for  semantic_kernel.kernel to DEBUG.
+        setup_logging()
+        logging.getLogger("kernel").setLevel(logging.DEBUG)
+
+        settings = execution_settings()
+
+        # Create a history of the conversation
+        history = ChatHistory()
+
+        # Initiate a back-and-forth chat
+        userInput = None
+        while True:
+            # Collect user input without blocking the event loop, end of input ends the session
+            try:
+                userInput = await ainput("User > ")
+            except EOFError:
+                userInput = "exit"
+
+            # Terminate the loop if the user says "exit"
+            if userInput == "exit":
+                # Show where the time went over the session
+                print(metrics.format_summary())
+                break
+
+            with metrics.timer("turn.total", agent="cli"):
+                # Add user input to the history
+                with metrics.timer("prompt.build", agent="cli"):
+                    history.add_user_message(userInput)
+
+                # Get the response from the AI
+                result = await chat_completion.get_chat_message_content(
+                    chat_history=history,
+                    settings=settings,
+                    kernel=kernel,
+                )
+
+            # Print the results
+            print("Assistant > " + str(result))
+
+            # Add the message from the agent to the chat history
+            history.add_message(result)
+    finally:
+        # Exiting before the warm-up finished must not leave it running
+        warming.cancel()
+        await asyncio.gather(warming, return_exceptions=True)
+
+
+def read_prompts(path: str):
+    """Yield (id, prompt, error) for each line of a JSONL file: {"id": ..., "prompt": ...} or a JSON string."""
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if isinstance(item, str):
+                    yield number, item, None
+                else:
+                    yield item.get("id", number), item["prompt"], None
+            except (ValueError, KeyError, AttributeError) as e:
+                # A malformed line becomes a failed item instead of stopping the batch
+                yield number, None, f"Invalid prompt line: {e!r}"
+
+
+async def run_item(item_id, prompt: str, settings: AzureChatPromptExecutionSettings) -> dict:
+    """Run one prompt in its own history, kernel and lights, returning its result record."""
+    record = {"id": item_id, "prompt": prompt}
+    start = time.perf_counter()
+    try:
+        kernel = get_kernel("cli", ("Lights",))
+        history = ChatHistory()
+        history.add_user_message(prompt)
+        # Every item starts from the default lights, whatever the items that ran before or alongside it changed
+        with own_lights(), metrics.timer("batch.item", agent="cli"):
+            result = await kernel.get_service("cli").get_chat_message_content(
+                chat_history=history,
+                settings=settings,
+                kernel=kernel,
+            )
+        record.update(ok=True, response=str(result))
+    except Exception as e:
+        record.update(ok=False, error=f"{type(e).__name__}: {e}")
+    record["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return record
+
+
+async def batch(input_path: str, output_path: str, concurrency: int):
+    """Run every prompt of a JSONL file independently, at most `concurrency` at a time.
+
+    Results are appended to the output JSONL as they finish, so a failed or interrupted item
+    never loses the others. Each record carries the time it waited for a slot and its latency.
+    """
+    settings = execution_settings()
+    # Build the shared kernel and open a connection per worker before the clock starts,
+    # so the first items do not wait on them
+    kernel_template("cli", ("Lights",))
+    await warm_up(concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"ok": 0, "failed": 0}
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as output:
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                item_id, prompt, error, queued_at = item
+                record = {"queue_ms": round((time.perf_counter() - queued_at) * 1000, 1)}
+                if error:
+                    record.update(id=item_id, ok=False, error=error)
+                else:
+                    record.update(await run_item(item_id, prompt, settings))
+                counts["ok" if record["ok"] else "failed"] += 1
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        # The bounded queue keeps only a few prompts in memory ahead of the workers
+        for item_id, prompt, error in read_prompts(input_path):
+            await queue.put((item_id, prompt, error, time.perf_counter()))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    elapsed = time.perf_counter() - started
+    total = counts["ok"] + counts["failed"]
+    print(
+        f"{total} prompts ({counts['failed']} failed) in {elapsed:.1f} s, "
+        f"{total / elapsed if elapsed else 0:.2f} prompts/s with concurrency {concurrency}"
+    )
+    print(metrics.format_summary())
 
-        # Print the results
-        print("Assistant > " + str(result))
 
-        # Add the message from the agent to the chat history
-        history.add_message(result)
+async def main():
+    parser = argparse.ArgumentParser(description="Chat with the lights agent, or run a batch of prompts")
+    parser.add_argument("--batch", metavar="PROMPTS.jsonl", help="run the prompts in this file instead of chatting")
+    parser.add_argument("--output", default="results.jsonl", help="where batch results are appended")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("BATCH_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY)),
+        help="maximum number of prompts in flight in batch mode",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.batch:
+            await batch(args.batch, args.output, max(args.concurrency, 1))
+        else:
+            await chat()
+    finally:
+        await close_shared_client()
 
 # Run the main function
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+import sys
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from a2a.client import A2AClient
+from a2a.types import (
+    DataPart,
+    FilePart,
+    FileWithUri,
+    JSONRPCErrorResponse,
+    Message,
+    Part,
+    SendMessageRequest,
+    SendMessageResponse,
+    TextPart,
+)
+
+sys.path.append('..')
+from agent_metrics import metrics
+
+
+@dataclass
+class AgentReply:
+    """What an agent answered, decoded from a SendMessageResponse."""
+
+    # "message", "task" or "error"
+    kind: str
+    texts: list[str] = field(default_factory=list)
+    data: list[dict[str, Any]] = field(default_factory=list)
+    # File URIs, or names for files sent inline
+    files: list[str] = field(default_factory=list)
+    task_id: str | None = None
+    state: str | None = None
+    error: str | None = None
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.texts)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _collect(parts: list[Part], reply: AgentReply):
+    for part in parts:
+        root = part.root
+        if isinstance(root, TextPart):
+            reply.texts.append(root.text)
+        elif isinstance(root, DataPart):
+            reply.data.append(root.data)
+        elif isinstance(root, FilePart):
+            file = root.file
+            reply.files.append(file.uri if isinstance(file, FileWithUri) else file.name or "<inline file>")
+
+
+def decode_response(response: SendMessageResponse) -> AgentReply:
+    """Decode a response by its result kind, reading the parts in place without dumping the model.
+
+    A message contributes its parts. A task contributes its status message, then the parts of
+    its artifacts, which is where agents put their results. A JSON-RPC error becomes an
+    error reply.
+    """
+    with metrics.timer("a2a.decode", stage="reply"):
+        return _decode(response.root)
+
+
+def _decode(root) -> AgentReply:
+    if isinstance(root, JSONRPCErrorResponse):
+        return AgentReply("error", error=f"{root.error.code}: {root.error.message}")
+
+    result = root.result
+    if isinstance(result, Message):
+        reply = AgentReply("message", task_id=result.taskId)
+        _collect(result.parts, reply)
+        return reply
+
+    reply = AgentReply("task", task_id=result.id, state=result.status.state.value)
+    if result.status.message is not None:
+        _collect(result.status.message.parts, reply)
+    for artifact in result.artifacts or ():
+        _collect(artifact.parts, reply)
+    return reply
+
+
+
+class TimedA2AClient(A2AClient):
+    """A2AClient that records how long validating each response body takes as `a2a.decode`."""
+
+    async def send_message(self, request: SendMessageRequest, *, http_kwargs=None, context=None) -> SendMessageResponse:
+        if not request.id:
+            request.id = str(uuid.uuid4())
+        payload, modified_kwargs = await self._apply_interceptors(
+            "message/send", request.model_dump(mode="json", exclude_none=True), http_kwargs, context
+        )
+        response_data = await self._send_request(payload, modified_kwargs)
+        with metrics.timer("a2a.decode", stage="validate"):
+            return SendMessageResponse.model_validate(response_data)
@@ -0,0 +1,465 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import httpx
+from a2a.client import A2ACardResolver
+from a2a.types import AgentCard
+
+from agent_router import AgentRouter
+from skill_tags import READ_ONLY_TAG
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_AGENT_CARD_PATH = "/.well-known/agent.json"
+HEALTH_CHECK_INTERVAL = float(os.getenv("A2A_HEALTH_CHECK_INTERVAL", 10))
+HEALTH_CHECK_TIMEOUT = 2.0
+# Outcomes remembered per endpoint, and the error rate over them that ejects it
+ERROR_WINDOW = 20
+MIN_REQUESTS = 5
+EJECT_ERROR_RATE = 0.5
+EJECT_SECONDS = 30.0
+# Weight of the newest latency in the moving average, and the estimate when no replica has one
+LATENCY_DECAY = 0.3
+INITIAL_LATENCY = 1.0
+# Latencies kept per pool to estimate the hedging threshold, and how many it needs first
+LATENCY_SAMPLES = 200
+MIN_HEDGE_SAMPLES = 10
+# Consecutive failed calls that open an agent's circuit, and how long it stays open
+BREAKER_FAILURES = 5
+BREAKER_RESET_SECONDS = 15.0
+# Connection attempts fail fast, while the per-agent deadline bounds the whole request
+CONNECT_TIMEOUT = 2.0
+
+
+def is_read_only(card: AgentCard) -> bool:
+    """Whether every skill of an agent is tagged read-only, so sending a request twice has no side effects."""
+    return bool(card.skills) and all(READ_ONLY_TAG in (skill.tags or []) for skill in card.skills)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an agent whose circuit is open."""
+
+
+class _FailedReply(Exception):
+    """A reply that arrived but reports a failure, carried through the retries as an error."""
+
+    def __init__(self, reply: Any):
+        super().__init__("the agent replied with an error")
+        self.reply = reply
+
+
+@dataclass
+class RequestPolicy:
+    """Deadline, retries and hedging for the requests to one agent."""
+
+    # Seconds for the whole request, including retries and hedges
+    timeout: float = float(os.getenv("A2A_TIMEOUT", 60))
+    # Extra attempts for read-only requests, with exponential backoff and full jitter
+    retries: int = 2
+    backoff: float = 0.25
+    # Latency percentile after which a read-only request is also sent to a second replica
+    hedge_percentile: float = 0.95
+    hedge_min_delay: float = 0.5
+
+
+def agent_policies() -> dict[str, RequestPolicy]:
+    """Per-agent policies from A2A_AGENT_TIMEOUTS, a JSON object of agent name to seconds."""
+    timeouts = json.loads(os.getenv("A2A_AGENT_TIMEOUTS") or "{}")
+    return {name: RequestPolicy(timeout=float(seconds)) for name, seconds in timeouts.items()}
+
+
+class CircuitBreaker:
+    """Fails fast while an agent keeps failing, then lets one trial request through.
+
+    The circuit opens after BREAKER_FAILURES consecutive failed calls. While it is open,
+    calls are refused for BREAKER_RESET_SECONDS; then it is half-open and a single call
+    decides whether it closes again or reopens.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.reset_seconds else "half-open"
+
+    def retry_in(self) -> float:
+        return max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0) if self.opened_at else 0.0
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def abandon(self):
+        """Give the trial slot back when a call was cancelled by its caller."""
+        self._trial = False
+
+    def record(self, ok: bool):
+        self._trial = False
+        if ok:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            return
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= self.failures:
+            if self.opened_at is None:
+                logger.warning(f"Opening circuit after {self.consecutive_failures} failed requests")
+            self.opened_at = time.monotonic()
+
+
+class Endpoint:
+    """One replica of an agent, with its load, latency and recent outcomes."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.latency: float | None = None
+        self.outcomes: deque[bool] = deque(maxlen=ERROR_WINDOW)
+        self.ejected_until = 0.0
+        self.failing_health_check = False
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def cost(self, default_latency: float) -> float:
+        """Expected wait for one more request: the queue ahead of it times its latency."""
+        return (self.outstanding + 1) * (self.latency if self.latency is not None else default_latency)
+
+    def eject(self, reason: str):
+        if self.available:
+            logger.warning(f"Ejecting {self.url} for {EJECT_SECONDS:.0f} s: {reason}")
+        self.ejected_until = time.monotonic() + EJECT_SECONDS
+
+    def reinstate(self):
+        if not self.available:
+            logger.info(f"Reinstating {self.url}")
+        self.ejected_until = 0.0
+        self.failing_health_check = False
+        self.latency = None
+        self.outcomes.clear()
+
+    def observe_latency(self, elapsed: float):
+        self.latency = elapsed if self.latency is None else self.latency + LATENCY_DECAY * (elapsed - self.latency)
+
+    def record(self, ok: bool, elapsed: float):
+        if self.ejected_until and self.available:
+            # Back from an ejection: the failures that caused it must not eject it again straight away
+            self.ejected_until = 0.0
+            self.outcomes.clear()
+        self.requests += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.observe_latency(elapsed)
+        else:
+            self.errors += 1
+            if len(self.outcomes) >= MIN_REQUESTS and self.error_rate >= EJECT_ERROR_RATE:
+                self.eject(f"{self.error_rate:.0%} of the last {len(self.outcomes)} requests failed")
+
+
+class AgentPool:
+    """The replicas of one agent, balanced by power of two choices on expected wait.
+
+    Each request compares two random available endpoints and takes the one with the lower
+    (outstanding + 1) * latency, which spreads load like least-outstanding-requests without
+    every request piling onto the same replica, and favors the faster replicas. An endpoint
+    whose recent error rate is too high is ejected for EJECT_SECONDS. One whose agent card
+    stops answering stays ejected until a health check passes again. New and reinstated
+    endpoints are assumed to be as fast as the pool's average, so they get traffic straight
+    away. When every endpoint is ejected, requests still go to one of them rather than
+    failing outright.
+
+    `call` adds the request policy on top: a deadline for every request, retries with backoff
+    and hedging to a second replica when the agent is read-only, and a circuit breaker that
+    fails fast while the agent is down.
+    """
+
+    def __init__(self, name: str, card: AgentCard, urls: list[str], policy: RequestPolicy | None = None):
+        self.name = name
+        self.card = card
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.policy = policy or RequestPolicy()
+        self.read_only = is_read_only(card)
+        self.breaker = CircuitBreaker()
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.hedges = 0
+        self.retries = 0
+
+    @property
+    def reachable(self) -> bool:
+        """Whether any endpoint still answers health checks."""
+        return any(not endpoint.failing_health_check for endpoint in self.endpoints)
+
+    def pick(self, exclude: Endpoint | None = None) -> Endpoint:
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.available and endpoint is not exclude]
+        candidates = candidates or [endpoint for endpoint in self.endpoints if endpoint is not exclude] or self.endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        measured = [endpoint.latency for endpoint in self.endpoints if endpoint.latency is not None]
+        default_latency = sum(measured) / len(measured) if measured else INITIAL_LATENCY
+        return first if first.cost(default_latency) <= second.cost(default_latency) else second
+
+    @asynccontextmanager
+    async def lease(self, endpoint: Endpoint | None = None):
+        """Pick an endpoint for one request, unless given one, and record how the request went."""
+        endpoint = endpoint or self.pick()
+        endpoint.outstanding += 1
+        start = time.perf_counter()
+        try:
+            yield endpoint
+        except asyncio.CancelledError:
+            # A hedge that lost the race or a missed deadline: slow, but not a failure
+            endpoint.observe_latency(time.perf_counter() - start)
+            raise
+        except BaseException:
+            endpoint.record(False, time.perf_counter() - start)
+            raise
+        else:
+            elapsed = time.perf_counter() - start
+            endpoint.record(True, elapsed)
+            self.latencies.append(elapsed)
+        finally:
+            endpoint.outstanding -= 1
+
+    def hedge_delay(self) -> float | None:
+        """How long to wait for a replica before asking a second one, None until there is enough data."""
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(int(len(ordered) * self.policy.hedge_percentile), len(ordered) - 1)
+        return max(ordered[index], self.policy.hedge_min_delay)
+
+    async def _attempt(self, operation: Callable[[Endpoint], Awaitable[Any]], endpoint: Endpoint | None = None):
+        async with self.lease(endpoint) as endpoint:
+            return await operation(endpoint)
+
+    async def _hedged(self, operation: Callable[[Endpoint], Awaitable[Any]]):
+        primary = self.pick()
+        delay = self.hedge_delay()
+        if delay is None or len(self.endpoints) < 2:
+            return await self._attempt(operation, primary)
+
+        # Every attempt still running when this returns or is cancelled, by the deadline say, is cancelled
+        pending = {asyncio.ensure_future(self._attempt(operation, primary))}
+        error: BaseException | None = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return done.pop().result()
+
+            backup = self.pick(exclude=primary)
+            self.hedges += 1
+            logger.info(f"Hedging {self.name} request to {backup.url} after {delay * 1000:.0f} ms")
+            pending.add(asyncio.ensure_future(self._attempt(operation, backup)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _call(self, operation: Callable[[Endpoint], Awaitable[Any]], read_only: bool):
+        attempts = self.policy.retries + 1 if read_only else 1
+        for attempt in range(attempts):
+            try:
+                return await (self._hedged(operation) if read_only else self._attempt(operation))
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise
+                delay = random.uniform(0, self.policy.backoff * 2**attempt)
+                self.retries += 1
+                logger.info(f"Retrying {self.name} request in {delay * 1000:.0f} ms after {e!r}")
+                await asyncio.sleep(delay)
+
+    async def call(
+        self, operation: Callable[[Endpoint], Awaitable[Any]], failed: Callable[[Any], bool] | None = None
+    ):
+        """Run operation(endpoint) on a replica under this agent's request policy.
+
+        A result for which failed(result) is true, such as a JSON-RPC error response, counts as a
+        failure of the replica and of the agent like an exception does. It is retried when the
+        agent is read-only, and returned when no attempt does better.
+
+        Requests are retried and hedged only when the agent card declares every skill read-only,
+        since a request that changes something could otherwise be applied twice. Raises CircuitOpenError without sending anything
+        while the circuit is open, and TimeoutError when the deadline passes.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(
+                f"{self.name} is failing, requests are refused for another {self.breaker.retry_in():.0f} s"
+            )
+        if failed is not None:
+            unchecked = operation
+
+            async def operation(endpoint: Endpoint):
+                result = await unchecked(endpoint)
+                if failed(result):
+                    raise _FailedReply(result)
+                return result
+
+        try:
+            result = await asyncio.wait_for(self._call(operation, self.read_only), self.policy.timeout)
+        except asyncio.TimeoutError:
+            self.breaker.record(False)
+            raise TimeoutError(f"{self.name} did not answer within {self.policy.timeout:.0f} s") from None
+        except asyncio.CancelledError:
+            # The caller gave up, which says nothing about the agent
+            self.breaker.abandon()
+            raise
+        except _FailedReply as e:
+            self.breaker.record(False)
+            return e.reply
+        except Exception:
+            self.breaker.record(False)
+            raise
+        self.breaker.record(True)
+        return result
+
+    async def check(self, httpx_client: httpx.AsyncClient):
+        """Fetch every endpoint's agent card, ejecting the ones that fail and reinstating the ones that recovered."""
+
+        async def check_endpoint(endpoint: Endpoint):
+            try:
+                response = await httpx_client.get(
+                    endpoint.url + PUBLIC_AGENT_CARD_PATH, timeout=HEALTH_CHECK_TIMEOUT
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                endpoint.failing_health_check = True
+                endpoint.eject(f"health check failed: {e!r}")
+                return
+            if endpoint.failing_health_check:
+                endpoint.reinstate()
+
+        await asyncio.gather(*[check_endpoint(endpoint) for endpoint in self.endpoints])
+
+    def describe(self) -> str:
+        lines = [f"{self.name}: circuit {self.breaker.state}, {self.retries} retries, {self.hedges} hedges"]
+        for endpoint in self.endpoints:
+            state = "up" if endpoint.available else "ejected"
+            latency = f"{endpoint.latency * 1000:.0f}ms" if endpoint.latency is not None else "-"
+            lines.append(
+                f"  {endpoint.url:<28} {state:<8} outstanding={endpoint.outstanding} "
+                f"latency={latency} requests={endpoint.requests} errors={endpoint.errors}"
+            )
+        return "\n".join(lines)
+
+
+class AgentPools:
+    """Agent pools discovered from a list of base URLs, kept healthy by a background task.
+
+    Replicas are grouped by the name on their agent card, so scaling an agent out only takes
+    adding the URLs of its new replicas. URLs that do not answer yet are retried on every
+    health check pass, so a replica started after the client still joins its pool.
+
+    `router` routes between the agents with at least one replica that answers health checks.
+    It is rebuilt whenever that set changes, so an agent discovered late becomes routable and
+    one whose replicas are all down stops getting requests until one comes back.
+    """
+
+    def __init__(
+        self,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL,
+        policies: dict[str, RequestPolicy] | None = None,
+    ):
+        self.pools: dict[str, AgentPool] = {}
+        self.health_check_interval = health_check_interval
+        self.policies = agent_policies() if policies is None else policies
+        self.undiscovered: set[str] = set()
+        self.router = AgentRouter()
+        self._httpx_client = httpx.AsyncClient()
+        self._health_task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "AgentPools":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def discover(self, base_urls: list[str], report: bool = True) -> dict[str, AgentPool]:
+        """Fetch the agent card of every URL and group the replicas that answered into pools."""
+
+        async def fetch(base_url: str) -> AgentCard | None:
+            resolver = A2ACardResolver(httpx_client=self._httpx_client, base_url=base_url)
+            try:
+                return await resolver.get_agent_card()
+            except Exception as e:
+                if report:
+                    print(f"Error fetching agent card from {base_url}: {e}")
+                return None
+
+        cards = await asyncio.gather(*[fetch(base_url) for base_url in base_urls])
+        for base_url, card in zip(base_urls, cards):
+            if card is None:
+                self.undiscovered.add(base_url)
+                continue
+            self.undiscovered.discard(base_url)
+            if card.name not in self.pools:
+                self.pools[card.name] = AgentPool(card.name, card, [], self.policies.get(card.name))
+            pool = self.pools[card.name]
+            if base_url.rstrip("/") not in {endpoint.url for endpoint in pool.endpoints}:
+                pool.endpoints.append(Endpoint(base_url))
+
+        self._update_router()
+        if self._health_task is None and self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._check_periodically())
+        return self.pools
+
+    async def check(self):
+        await asyncio.gather(*[pool.check(self._httpx_client) for pool in self.pools.values()])
+        if self.undiscovered:
+            await self.discover(sorted(self.undiscovered), report=False)
+        self._update_router()
+
+    def _update_router(self):
+        routable = {name: pool.card for name, pool in self.pools.items() if pool.reachable}
+        if routable.keys() != self.router.cards.keys():
+            self.router = AgentRouter(routable)
+
+    async def _check_periodically(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Health check pass failed: {e}")
+
+    def describe(self) -> str:
+        return "\n".join(pool.describe() for pool in self.pools.values())
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+        await self._httpx_client.aclose()
@@ -0,0 +1,157 @@
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+
+from a2a.types import AgentCard
+
+# Postings kept per term, so a term shared by many agents costs the same as a rare one
+MAX_POSTINGS = 32
+
+# How much each part of an agent card counts towards its profile
+FIELD_WEIGHTS = {
+    "name": 2.0,
+    "description": 1.0,
+    "skill_name": 2.0,
+    "skill_description": 1.0,
+    "tags": 3.0,
+    "examples": 1.0,
+}
+
+STOPWORDS = frozenset(
+    "a an the and or to of in on for me my i you your is are be can please with at by from it this that "
+    "what which show get all some any do does".split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Sentence ends, semicolons and conjunctions that usually start a new request
+_CLAUSE_BREAK = re.compile(r"[.;!?]+\s+|\s*;\s*|,?\s+(?:and then|and also|then|also|and)\s+", re.IGNORECASE)
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+@dataclass
+class Route:
+    agent: str
+    text: str
+    score: float
+
+
+class AgentRouter:
+    """Routes free-text requests to agents by matching them against their agent cards.
+
+    Each card's name, description and skills (names, descriptions, tags and examples) become
+    a normalized TF-IDF vector, stored as an inverted index from term to agents. A query only
+    touches the postings of its own terms, so routing takes microseconds and does not grow
+    with the number of agents.
+    """
+
+    def __init__(self, cards: dict[str, AgentCard] | None = None):
+        self.cards: dict[str, AgentCard] = dict(cards or {})
+        self._postings: dict[str, list[tuple[str, float]]] = {}
+        self._build()
+
+    def add(self, name: str, card: AgentCard):
+        """Register or replace an agent and rebuild the index."""
+        self.cards[name] = card
+        self._build()
+
+    @staticmethod
+    def _profile(card: AgentCard) -> dict[str, float]:
+        counts: dict[str, float] = defaultdict(float)
+
+        def add(text: str | None, field: str):
+            for term in tokenize(text or ""):
+                counts[term] += FIELD_WEIGHTS[field]
+
+        add(card.name, "name")
+        add(card.description, "description")
+        for skill in card.skills or []:
+            add(skill.name, "skill_name")
+            add(skill.description, "skill_description")
+            add(" ".join(skill.tags or []), "tags")
+            add(" ".join(skill.examples or []), "examples")
+        return counts
+
+    def _build(self):
+        profiles = {name: self._profile(card) for name, card in self.cards.items()}
+        document_frequency: dict[str, int] = defaultdict(int)
+        for counts in profiles.values():
+            for term in counts:
+                document_frequency[term] += 1
+
+        postings: dict[str, list[tuple[str, float]]] = defaultdict(list)
+        total = len(profiles)
+        for name, counts in profiles.items():
+            # Smoothed IDF, so a term every agent shares still counts when there is only one agent
+            weights = {
+                term: (1 + math.log(count)) * math.log(1 + total / document_frequency[term])
+                for term, count in counts.items()
+            }
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for term, weight in weights.items():
+                postings[term].append((name, weight / norm))
+
+        self._postings = {
+            term: sorted(entries, key=lambda entry: entry[1], reverse=True)[:MAX_POSTINGS]
+            for term, entries in postings.items()
+        }
+
+    def scores(self, text: str) -> dict[str, float]:
+        """Similarity of the request to every agent that shares at least one term with it."""
+        scores: dict[str, float] = defaultdict(float)
+        for term in set(tokenize(text)):
+            for name, weight in self._postings.get(term, ()):
+                scores[name] += weight
+        return scores
+
+    def route(self, text: str) -> Route | None:
+        """The best agent for a request, or None when no agent matches any of its terms."""
+        scores = self.scores(text)
+        if not scores:
+            return None
+        agent = max(scores, key=scores.get)
+        return Route(agent, text, scores[agent])
+
+    def split(self, text: str) -> list[Route]:
+        """Split a compound request into one sub-request per agent.
+
+        The request is cut at sentence ends and conjunctions, and each clause is routed on its
+        own. A clause that matches no agent ("and then do it") stays with the clause before it,
+        and the clauses for the same agent are joined in their original order, so a request is
+        only split when its parts really belong to different agents.
+        """
+        clauses = [clause.strip() for clause in _CLAUSE_BREAK.split(text) if clause and clause.strip()]
+        routed: list[list] = []
+        pending: list[str] = []
+        for clause in clauses:
+            route = self.route(clause)
+            if route is None:
+                if routed:
+                    routed[-1][1].append(clause)
+                else:
+                    pending.append(clause)
+                continue
+            routed.append([route.agent, pending + [clause], route.score])
+            pending = []
+        if not routed:
+            return []
+
+        merged: dict[str, Route] = {}
+        for agent, parts, score in routed:
+            if agent in merged:
+                merged[agent].text += " and " + " ".join(parts)
+                merged[agent].score = max(merged[agent].score, score)
+            else:
+                merged[agent] = Route(agent, " ".join(parts), score)
+        return list(merged.values())
@@ -1,32 +1,37 @@
+import json
 import os
+import sys
 import uuid
 import httpx
 import asyncio
-from a2a.client import A2ACardResolver, A2AClient
 from a2a.types import (
-    AgentCard,
+    JSONRPCErrorResponse,
     Message,
     MessageSendParams,
     Part,
     Role,
     SendMessageRequest,
+    SendMessageResponse,
     TextPart,
 )
 
-from ioa_observe.sdk import Observe
 from ioa_observe.sdk.decorators import graph
-from ioa_observe.sdk.instrumentations.a2a import A2AInstrumentor
 from ioa_observe.sdk.tracing import session_start
 
-PUBLIC_AGENT_CARD_PATH = "/.well-known/agent.json"
+sys.path.append('..')
+from a2a_responses import AgentReply, TimedA2AClient, decode_response
+from agent_pool import CONNECT_TIMEOUT, AgentPool, AgentPools, CircuitOpenError
+from async_input import ainput
+from telemetry_config import init_telemetry
+
 LIGHTS_BASE_URL = "http://localhost:8001"
 GITHUB_BASE_URL = "http://localhost:8002"
+# Comma-separated base URLs of the agents the client routes between, replicas included
+AGENT_URLS = [
+    url.strip() for url in os.getenv("A2A_AGENT_URLS", f"{LIGHTS_BASE_URL},{GITHUB_BASE_URL}").split(",") if url.strip()
+]
 
-Observe.init(
-    "multi-agent-client", api_endpoint=os.getenv("OTLP_HTTP_ENDPOINT")
-)
-
-A2AInstrumentor().instrument()
+TELEMETRY_MODE = init_telemetry("multi-agent-client", instrument_a2a=True)
 
 
 @graph(name="get_agents")
@@ -40,172 +45,150 @@ def get_agents() -> list:
     return ["multi-agent-client", "multi-agent-lights-server", "multi-agent-github-server"]
 
 
-async def get_agent_info(base_url: str, agent_name: str) -> tuple[A2AClient, AgentCard]:
-    """Get agent information and create a client"""
-    async with httpx.AsyncClient() as httpx_client:
-        # Fetch the agent card
-        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=base_url)
-        try:
-            print(f"Fetching {agent_name} agent card from: {base_url}{PUBLIC_AGENT_CARD_PATH}")
-            agent_card: AgentCard = await resolver.get_agent_card()
-            print(f"{agent_name} agent card fetched successfully:")
-            print(f"  Name: {agent_card.name}")
-            print(f"  Description: {agent_card.description}")
-            print(f"  Skills: {len(agent_card.skills)} available")
-            
-            # Initialize A2A client with the agent card
-            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
-            return client, agent_card
-            
-        except Exception as e:
-            print(f"Error fetching {agent_name} agent card: {e}")
-            return None, None
-
-
-async def send_message_to_agent(client: A2AClient, message_text: str, agent_name: str):
-    """Send a message to a specific agent"""
+def build_message_request(message_text: str) -> SendMessageRequest:
+    """Build the A2A request for a text message"""
+    message_payload = Message(
+        role=Role.user,
+        messageId=str(uuid.uuid4()),
+        parts=[Part(root=TextPart(text=message_text))],
+    )
+    return SendMessageRequest(
+        id=str(uuid.uuid4()),
+        params=MessageSendParams(message=message_payload),
+    )
+
+
+def print_response(reply: AgentReply, agent_name: str):
+    """Print the text, data and files of an agent's reply"""
+    print(f"{agent_name} Response:")
+    if reply.error:
+        print(f"  Error {reply.error}")
+    for text in reply.texts:
+        print(f"  {text}")
+    for data in reply.data:
+        print(f"  {json.dumps(data)}")
+    for file in reply.files:
+        print(f"  [file] {file}")
+    if reply.ok and not (reply.texts or reply.data or reply.files):
+        print(f"  [No content{f', task {reply.state}' if reply.state else ''}]")
+
+
+def is_error_response(response: SendMessageResponse) -> bool:
+    """A JSON-RPC error counts as a failed request for the replica and the circuit breaker"""
+    return isinstance(response.root, JSONRPCErrorResponse)
+
+
+async def send_to_pool(httpx_client: httpx.AsyncClient, pool: AgentPool, message_text: str) -> AgentReply | None:
+    """Send a message to an agent under its timeout, retry, hedging and circuit breaker policy"""
+    print(f"\nSending message to {pool.name}: '{message_text}'")
+    request = build_message_request(message_text)
+
+    async def send(endpoint):
+        # The card advertises a single URL, so address the chosen replica directly
+        client = TimedA2AClient(httpx_client=httpx_client, url=endpoint.url)
+        return await client.send_message(request)
+
     try:
-        # Build message
-        message_payload = Message(
-            role=Role.user,
-            messageId=str(uuid.uuid4()),
-            parts=[Part(root=TextPart(text=message_text))],
-        )
-        request = SendMessageRequest(
-            id=str(uuid.uuid4()),
-            params=MessageSendParams(message=message_payload),
-        )
-
-        # Send message
-        print(f"\nSending message to {agent_name}: '{message_text}'")
-        response = await client.send_message(request)
-
-        # Print response
-        print(f"{agent_name} Response:")
-        
-        # First, let's see the full response structure for debugging
-        response_dict = response.model_dump()
-        
-        # Try to extract the message content
-        message_found = False
-        
-        # Check for different possible response structures
-        if hasattr(response, 'message') and response.message:
-            if hasattr(response.message, 'parts') and response.message.parts:
-                for part in response.message.parts:
-                    if hasattr(part, 'root') and hasattr(part.root, 'text'):
-                        print(f"  {part.root.text}")
-                        message_found = True
-        
-        # If we have a result field
-        if hasattr(response, 'result') and response.result:
-            if hasattr(response.result, 'message') and response.result.message:
-                if hasattr(response.result.message, 'parts') and response.result.message.parts:
-                    for part in response.result.message.parts:
-                        if hasattr(part, 'root') and hasattr(part.root, 'text'):
-                            print(f"  {part.root.text}")
-                            message_found = True
-        
-        # If we have events
-        if hasattr(response, 'events') and response.events:
-            for event in response.events:
-                if hasattr(event, 'message') and event.message:
-                    if hasattr(event.message, 'parts') and event.message.parts:
-                        for part in event.message.parts:
-                            if hasattr(part, 'root') and hasattr(part.root, 'text'):
-                                print(f"  {part.root.text}")
-                                message_found = True
-        
-        # If we couldn't extract a message, show the full response for debugging
-        if not message_found:
-            print("  [Full Response for debugging]:")
-            print(f"  {response.model_dump_json(indent=4)}")
-            
+        reply = decode_response(await pool.call(send, failed=is_error_response))
+    except (CircuitOpenError, TimeoutError) as e:
+        print(f"{pool.name} unavailable: {e}")
     except Exception as e:
-        print(f"Error sending message to {agent_name}: {e}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error sending message to {pool.name}: {e}")
+    else:
+        print_response(reply, pool.name)
+        return reply
+    return None
 
 
 async def interactive_mode():
-    """Run an interactive session where users can choose which agent to talk to"""
+    """Run an interactive session where each message is routed to the agents that can handle it"""
     print("\n=== Multi-Agent A2A System ===")
-    print("Available agents:")
-    print("1. Lights Agent - Control smart lights")
-    print("2. GitHub Agent - Query GitHub repositories")
-    print("3. Exit")
-    
-    # Initialize agents
-    lights_client, lights_card = await get_agent_info(LIGHTS_BASE_URL, "Lights")
-    github_client, github_card = await get_agent_info(GITHUB_BASE_URL, "GitHub")
-    
-    if not lights_client or not github_client:
-        print("Failed to initialize one or more agents. Please ensure both servers are running.")
-        return
 
-    session_start()
-    get_agents()  # Register agents with observability
+    async with AgentPools() as pools:
+        # Initialize agents, grouping the replicas of each one into a pool
+        await pools.discover(AGENT_URLS)
+        if not pools.pools:
+            print("Failed to initialize any agent. Please ensure the servers are running.")
+            return
 
-    while True:
-        try:
-            print("\n" + "="*50)
-            choice = input("Choose an agent (1-3): ").strip()
-            
-            if choice == "3":
-                print("Goodbye!")
+        print("Available agents:")
+        for name, pool in pools.pools.items():
+            skills = ", ".join(skill.name for skill in pool.card.skills)
+            print(f"- {name}: {skills} ({len(pool.endpoints)} replica(s))")
+        print("Type a request in plain words, 'status' for the replicas, or 'exit' to quit.")
+
+        if TELEMETRY_MODE != "off":
+            # Sessions need a tracer, which is not set up when telemetry is off
+            session_start()
+        get_agents()  # Register agents with observability
+
+        while True:
+            try:
+                print("\n" + "="*50)
+                message = (await ainput("Message: ")).strip()
+
+                if message.lower() in ("exit", "quit"):
+                    print("Goodbye!")
+                    break
+                if message.lower() == "status":
+                    print(pools.describe())
+                    continue
+                if not message:
+                    continue
+
+                # A compound request becomes one sub-request per agent, sent in parallel. The router
+                # follows the health checks, so it only knows the agents that are up right now
+                routes = pools.router.split(message)
+                if not routes:
+                    print(f"No agent matches that request. Available agents: {', '.join(pools.router.cards)}")
+                    continue
+                # No read timeout here: each agent's deadline bounds its requests
+                async with httpx.AsyncClient(timeout=httpx.Timeout(None, connect=CONNECT_TIMEOUT)) as httpx_client:
+                    await asyncio.gather(
+                        *[send_to_pool(httpx_client, pools.pools[route.agent], route.text) for route in routes]
+                    )
+            except EOFError:
+                print("\nReceived EOF. Exiting...")
+                break
+            except KeyboardInterrupt:
+                print("\nReceived interrupt. Exiting...")
                 break
-            elif choice == "1":
-                message = input("Message for Lights Agent: ").strip()
-                if message:
-                    async with httpx.AsyncClient() as httpx_client:
-                        client = A2AClient(httpx_client=httpx_client, agent_card=lights_card)
-                        await send_message_to_agent(client, message, "Lights Agent")
-            elif choice == "2":
-                message = input("Message for GitHub Agent: ").strip()
-                if message:
-                    async with httpx.AsyncClient() as httpx_client:
-                        client = A2AClient(httpx_client=httpx_client, agent_card=github_card)
-                        await send_message_to_agent(client, message, "GitHub Agent")
-            else:
-                print("Invalid choice. Please enter 1, 2, or 3.")
-        except EOFError:
-            print("\nReceived EOF. Exiting...")
-            break
-        except KeyboardInterrupt:
-            print("\nReceived interrupt. Exiting...")
-            break
 
 
 async def demo_mode():
-    """Run a demo with predefined messages to both agents"""
+    """Run a demo with predefined messages, each routed to the agent that can handle it"""
     print("\n=== Multi-Agent A2A Demo ===")
-    
-    # Initialize agents
-    lights_client, lights_card = await get_agent_info(LIGHTS_BASE_URL, "Lights")
-    github_client, github_card = await get_agent_info(GITHUB_BASE_URL, "GitHub")
-    
-    if not lights_client or not github_client:
-        print("Failed to initialize one or more agents. Please ensure both servers are running.")
-        return
 
-    session_start()
-    get_agents()  # Register agents with observability
-
-    # Demo messages
-    demo_messages = [
-        ("Lights Agent", lights_card, "Show me all the lights and their current state"),
-        ("Lights Agent", lights_card, "Turn on the table lamp"),
-        ("GitHub Agent", github_card, "Get my GitHub user profile"),
-        ("GitHub Agent", github_card, "Show me open issues in microsoft/semantic-kernel repository"),
-        ("Lights Agent", lights_card, "Turn off all lights"),
-    ]
+    async with AgentPools() as pools:
+        # Initialize agents
+        await pools.discover(AGENT_URLS)
+        if not pools.pools:
+            print("Failed to initialize any agent. Please ensure the servers are running.")
+            return
 
-    for agent_name, agent_card, message in demo_messages:
-        async with httpx.AsyncClient() as httpx_client:
-            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
-            await send_message_to_agent(client, message, agent_name)
-            await asyncio.sleep(2)  # Small delay between messages
+        if TELEMETRY_MODE != "off":
+            # Sessions need a tracer, which is not set up when telemetry is off
+            session_start()
+        get_agents()  # Register agents with observability
+
+        # Demo messages
+        demo_messages = [
+            "Show me all the lights and their current state",
+            "Turn on the table lamp",
+            "Get my GitHub user profile",
+            "Show me open issues in microsoft/semantic-kernel repository",
+            "Turn off all lights",
+        ]
+
+        # No read timeout here: each agent's deadline bounds its requests
+        async with httpx.AsyncClient(timeout=httpx.Timeout(None, connect=CONNECT_TIMEOUT)) as httpx_client:
+            for message in demo_messages:
+                route = pools.router.route(message)
+                if route is None:
+                    print(f"\nNo agent matches '{message}'. Available agents: {', '.join(pools.router.cards)}")
+                else:
+                    await send_to_pool(httpx_client, pools.pools[route.agent], message)
+                await asyncio.sleep(2)  # Small delay between messages
 
 
 async def main():
@@ -228,7 +211,7 @@ async def main():
     print("2. Interactive mode")
     
     try:
-        choice = input("Choose mode (1-2): ").strip()
+        choice = (await ainput("Choose mode (1-2): ")).strip()
         
         if choice == "1":
             await demo_mode()
@@ -1,11 +1,7 @@
 import asyncio
 import os
-from datetime import datetime
 from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel.connectors.ai import FunctionChoiceBehavior
-from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion
-from semantic_kernel.functions import KernelArguments
-from semantic_kernel.kernel import Kernel
 from semantic_kernel.contents.chat_history import ChatHistory
 from a2a.server.agent_execution import AgentExecutor
 from a2a.server.agent_execution.context import RequestContext
@@ -17,7 +13,21 @@ from ioa_observe.sdk.decorators import agent
 # Import the existing GitHub plugin
 import sys
 sys.path.append('..')
-from github import GitHubPlugin, GitHubSettings
+from agent_metrics import metrics
+from kernel_registry import get_kernel, kernel_template
+from prompt_layout import context_message, current_time
+
+# Static, so the prompt prefix (tools and instructions) is the same for every request and cached
+# by the provider. The current time goes in a context message after it.
+GITHUB_INSTRUCTIONS = """
+You are an agent designed to query and retrieve information from GitHub repositories in a read-only
+manner. You are also able to access the profile of the active user.
+
+Use the current date and time from the context message to provide up-to-date details or time-sensitive responses.
+
+The default repository you can query is: microsoft/semantic-kernel
+You can also query other public repositories if the user specifies them.
+"""
 
 
 class GithubAgentCore:
@@ -30,66 +40,41 @@ class GithubAgentCore:
         self._setup_kernel()
 
     def _setup_kernel(self):
-        """Initialize the Semantic Kernel with GitHubPlugin"""
-        self.kernel = Kernel()
-
-        # Add OpenAI chat completion
+        """Build the shared kernel with GitHubPlugin once, at startup"""
         service_id = "github_agent"
-        self.chat_completion = OpenAIChatCompletion(
-            api_key=os.environ["OPENAI_API_KEY"], 
-            ai_model_id="gpt-4o-mini", 
-            service_id=service_id
-        )
-        self.kernel.add_service(self.chat_completion)
+        self.kernel = kernel_template(service_id, ("GithubPlugin",), parallel_tools=True)
+        self.chat_completion = self.kernel.get_service(service_id)
 
         # Configure function choice behavior
         self.settings = self.kernel.get_prompt_execution_settings_from_service_id(service_id=service_id)
         self.settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
 
-        # Set up GitHub plugin
-        gh_settings = GitHubSettings(token=os.getenv("GITHUB_ACCESS_TOKEN"))
-        self.kernel.add_plugin(plugin=GitHubPlugin(gh_settings), plugin_name="GithubPlugin")
-
     async def invoke(self, user_input: str) -> str:
         """Process user input and return response about GitHub queries"""
         try:
-            current_time = datetime.now().isoformat()
-            
-            # Create a specialized GitHub agent
-            agent = ChatCompletionAgent(
-                kernel=self.kernel,
-                name="GithubAssistantAgent",
-                instructions=f"""
-                You are an agent designed to query and retrieve information from GitHub repositories in a read-only
-                manner. You are also able to access the profile of the active user.
-
-                Use the current date and time to provide up-to-date details or time-sensitive responses.
-
-                The default repository you can query is: microsoft/semantic-kernel
-                You can also query other public repositories if the user specifies them.
-
-                The current date and time is: {current_time}.
-                """,
-            )
-
-            # Create arguments with current time
-            arguments = KernelArguments(now=datetime.now().strftime("%Y-%m-%d %H:%M"))
-
-            # Process the user input
-            response_generator = agent.invoke(
-                messages=user_input, 
-                thread=None, 
-                arguments=arguments
-            )
-            
-            # Collect all response parts
-            full_response = ""
-            async for response in response_generator:
-                if response.content:
-                    full_response += str(response.content)
+            with metrics.timer("turn.total", agent="github"):
+                with metrics.timer("prompt.build", agent="github"):
+                    # Create a specialized GitHub agent
+                    agent = ChatCompletionAgent(
+                        kernel=get_kernel("github_agent", ("GithubPlugin",), parallel_tools=True),
+                        name="GithubAssistantAgent",
+                        instructions=GITHUB_INSTRUCTIONS,
+                    )
+
+                # Process the user input, with the current time after the cached prefix
+                response_generator = agent.invoke(
+                    messages=[context_message(current_time=current_time()), user_input],
+                    thread=None,
+                )
+
+                # Collect all response parts
+                full_response = ""
+                async for response in response_generator:
+                    if response.content:
+                        full_response += str(response.content)
 
             return full_response if full_response else "No response generated from GitHub agent"
-            
+
         except Exception as e:
             return f"Error processing GitHub request: {str(e)}"
 
@@ -1,28 +1,30 @@
 import os
-import uvicorn
-from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill
 from github_agent_executor import GithubAgentExecutor
+from agent_metrics import metrics_route
+from openai_client import openai_lifespan
+from profiler import profile_routes
+from server_runtime import TimedA2AStarletteApplication, run_server, runtime_lifespan
+from skill_tags import READ_ONLY_TAG
+from telemetry_config import init_telemetry
 
-from ioa_observe.sdk import Observe
-from ioa_observe.sdk.instrumentations.a2a import A2AInstrumentor
-
-Observe.init(
-    "multi-agent-github-server", api_endpoint=os.getenv("OTLP_HTTP_ENDPOINT")
-)
-
-A2AInstrumentor().instrument()
+init_telemetry("multi-agent-github-server", instrument_a2a=True)
 
 
 def main():
+    # Replicas run side by side on different ports, e.g. GITHUB_SERVER_PORT=8012 python github_server.py
+    host = os.getenv("GITHUB_SERVER_HOST", "0.0.0.0")
+    port = int(os.getenv("GITHUB_SERVER_PORT", 8002))
+
     # Define the skill metadata for GitHub operations
     skill = AgentSkill(
         id="github_operations",
         name="GitHub Repository Assistant",
         description="Queries GitHub repositories, user profiles, issues, and repository information",
-        tags=["github", "repository", "issues", "development", "api"],
+        # The agent only reads from GitHub, so clients may retry and hedge its requests
+        tags=["github", "repository", "issues", "development", "api", READ_ONLY_TAG],
         examples=[
             "Get my GitHub profile",
             "Show me issues in microsoft/semantic-kernel",
@@ -37,7 +39,7 @@ def main():
     agent_card = AgentCard(
         name="GitHub Assistant Agent",
         description="An AI agent that can query GitHub repositories and retrieve information about users, repositories, and issues.",
-        url="http://localhost:8002/",
+        url=f"http://localhost:{port}/",
         defaultInputModes=["text"],
         defaultOutputModes=["text"],
         skills=[skill],
@@ -52,13 +54,18 @@ def main():
     )
 
     # Create the A2A app server
-    server = A2AStarletteApplication(
+    server = TimedA2AStarletteApplication(
+        agent="github",
         http_handler=request_handler,
         agent_card=agent_card,
     )
 
-    # Run the server
-    uvicorn.run(server.build(), host="0.0.0.0", port=8002)
+    # Run the server, with the in-process latency metrics served at /metrics and the OpenAI
+    # connections opened at startup rather than by the first request. With PROFILING_TOKEN set,
+    # POST /admin/profile samples the server on demand. The runtime picks the event loop and
+    # HTTP parser, runs slow sync tools on a thread pool and reports calls that block the loop
+    app = server.build(routes=[metrics_route(), *profile_routes()], lifespan=runtime_lifespan(openai_lifespan))
+    run_server(app, host, port)
 
 
 if __name__ == "__main__":
@@ -1,13 +1,10 @@
 import asyncio
 import os
 import json
-from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
 from semantic_kernel.connectors.ai.open_ai.prompt_execution_settings.azure_chat_prompt_execution_settings import (
     AzureChatPromptExecutionSettings,
 )
-from semantic_kernel.contents.chat_history import ChatHistory
 from a2a.server.agent_execution import AgentExecutor
 from a2a.server.agent_execution.context import RequestContext
 from a2a.server.events.event_queue import EventQueue
@@ -18,7 +15,20 @@ from ioa_observe.sdk.decorators import agent
 # Import the existing LightsPlugin
 import sys
 sys.path.append('..')
-from lights_plugin import LightsPlugin
+from agent_metrics import metrics
+from kernel_registry import get_kernel, kernel_template, plugin
+from light_catalog import LightCatalog, light_context
+from prompt_layout import build_history
+
+# Static, so the prompt prefix (tools and instructions) is the same for every request and cached
+# by the provider. The lights and their state change, and go in the context message instead.
+LIGHTS_INSTRUCTIONS = (
+    "You are a smart lights control agent. You can get the current state of lights "
+    "and change their on/off state. The lights named in the request, with their ids and "
+    "their state when the request was made, are listed in the context message. For any "
+    "other light, or to act on every light, call get_lights first. When users ask about "
+    "lights, use the available functions to help them."
+)
 
 
 class LightsAgentCore:
@@ -28,24 +38,15 @@ class LightsAgentCore:
         self.kernel = None
         self.chat_completion = None
         self.execution_settings = None
+        self.catalog = None
         self._setup_kernel()
 
     def _setup_kernel(self):
-        """Initialize the Semantic Kernel with LightsPlugin"""
-        self.kernel = Kernel()
-
-        # Add OpenAI chat completion
-        self.chat_completion = OpenAIChatCompletion(
-            api_key=os.environ["OPENAI_API_KEY"],
-            ai_model_id="gpt-4o-mini",
-        )
-        self.kernel.add_service(self.chat_completion)
-
-        # Add the LightsPlugin
-        self.kernel.add_plugin(
-            LightsPlugin(),
-            plugin_name="Lights",
-        )
+        """Build the shared kernel with LightsPlugin once, at startup"""
+        self.kernel = kernel_template("lights_agent", ("Lights",), parallel_tools=True)
+        self.chat_completion = self.kernel.get_service("lights_agent")
+        # Name lookup over the shared plugin's lights, which the kernels' functions change
+        self.catalog = LightCatalog(plugin("Lights").lights)
 
         # Enable planning
         self.execution_settings = AzureChatPromptExecutionSettings()
@@ -54,26 +55,17 @@ class LightsAgentCore:
     async def invoke(self, user_input: str) -> str:
         """Process user input and return response about lights control"""
         try:
-            # Create a history for this single interaction
-            history = ChatHistory()
-            
-            # Add system message to guide the agent
-            history.add_system_message(
-                "You are a smart lights control agent. You can get the current state of lights "
-                "and change their on/off state. Available lights are: Table Lamp (id: 1), "
-                "Porch light (id: 2), and Chandelier (id: 3). When users ask about lights, "
-                "use the available functions to help them."
-            )
-            
-            # Add user input to the history
-            history.add_user_message(user_input)
-
-            # Get the response from the AI
-            result = await self.chat_completion.get_chat_message_content(
-                chat_history=history,
-                settings=self.execution_settings,
-                kernel=self.kernel,
-            )
+            with metrics.timer("turn.total", agent="lights"):
+                with metrics.timer("prompt.build", agent="lights"):
+                    # Create a history for this single interaction, with the lights it names after the instructions
+                    history = build_history(LIGHTS_INSTRUCTIONS, user_input, **light_context(self.catalog, user_input))
+
+                # Get the response from the AI
+                result = await self.chat_completion.get_chat_message_content(
+                    chat_history=history,
+                    settings=self.execution_settings,
+                    kernel=get_kernel("lights_agent", ("Lights",), parallel_tools=True),
+                )
 
             return str(result)
         except Exception as e:
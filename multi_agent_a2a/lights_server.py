@@ -1,22 +1,22 @@
 import os
-import uvicorn
-from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill
 from lights_agent_executor import LightsAgentExecutor
+from agent_metrics import metrics_route
+from openai_client import openai_lifespan
+from profiler import profile_routes
+from server_runtime import TimedA2AStarletteApplication, run_server, runtime_lifespan
+from telemetry_config import init_telemetry
 
-from ioa_observe.sdk import Observe
-from ioa_observe.sdk.instrumentations.a2a import A2AInstrumentor
-
-Observe.init(
-    "multi-agent-lights-server", api_endpoint=os.getenv("OTLP_HTTP_ENDPOINT")
-)
-
-A2AInstrumentor().instrument()
+init_telemetry("multi-agent-lights-server", instrument_a2a=True)
 
 
 def main():
+    # Replicas run side by side on different ports, e.g. LIGHTS_SERVER_PORT=8011 python lights_server.py
+    host = os.getenv("LIGHTS_SERVER_HOST", "0.0.0.0")
+    port = int(os.getenv("LIGHTS_SERVER_PORT", 8001))
+
     # Define the skill metadata for lights control
     skill = AgentSkill(
         id="lights_control",
@@ -36,7 +36,7 @@ def main():
     agent_card = AgentCard(
         name="Lights Control Agent",
         description="An AI agent that can control smart lights in your home. Can check light status and turn lights on or off.",
-        url="http://localhost:8001/",
+        url=f"http://localhost:{port}/",
         defaultInputModes=["text"],
         defaultOutputModes=["text"],
         skills=[skill],
@@ -51,13 +51,18 @@ def main():
     )
 
     # Create the A2A app server
-    server = A2AStarletteApplication(
+    server = TimedA2AStarletteApplication(
+        agent="lights",
         http_handler=request_handler,
         agent_card=agent_card,
     )
 
-    # Run the server
-    uvicorn.run(server.build(), host="0.0.0.0", port=8001)
+    # Run the server, with the in-process latency metrics served at /metrics and the OpenAI
+    # connections opened at startup rather than by the first request. With PROFILING_TOKEN set,
+    # POST /admin/profile samples the server on demand. The runtime picks the event loop and
+    # HTTP parser, runs slow sync tools on a thread pool and reports calls that block the loop
+    app = server.build(routes=[metrics_route(), *profile_routes()], lifespan=runtime_lifespan(openai_lifespan))
+    run_server(app, host, port)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+# Skill tags that carry meaning between the A2A servers and the client
+
+# An agent whose skills all have this tag never changes anything, so its requests can be retried or hedged
+READ_ONLY_TAG = "read-only"
@@ -0,0 +1,95 @@
+import asyncio
+import importlib.util
+import logging
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 90.0
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_WARM_CONNECTIONS = 2
+WARM_UP_TIMEOUT = 5.0
+
+
+@lru_cache(maxsize=None)
+def _http2_enabled() -> bool:
+    if os.getenv("OPENAI_HTTP2", "").lower() not in ("1", "true", "yes"):
+        return False
+    # HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("OPENAI_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def shared_http_client() -> httpx.AsyncClient:
+    """The connection pool behind the shared OpenAI client.
+
+    Pool size, keep-alive, HTTP/2 and timeouts come from OPENAI_MAX_CONNECTIONS,
+    OPENAI_KEEPALIVE_CONNECTIONS, OPENAI_KEEPALIVE_EXPIRY, OPENAI_HTTP2, OPENAI_TIMEOUT and
+    OPENAI_CONNECT_TIMEOUT.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+            max_keepalive_connections=int(os.getenv("OPENAI_KEEPALIVE_CONNECTIONS", DEFAULT_KEEPALIVE_CONNECTIONS)),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY)),
+        ),
+        timeout=httpx.Timeout(
+            float(os.getenv("OPENAI_TIMEOUT", DEFAULT_TIMEOUT)),
+            connect=float(os.getenv("OPENAI_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+        ),
+        http2=_http2_enabled(),
+    )
+
+
+@lru_cache(maxsize=None)
+def shared_openai_client() -> AsyncOpenAI:
+    """The process-wide OpenAI client, so every agent and service shares one warm connection pool."""
+    return AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"], http_client=shared_http_client())
+
+
+async def warm_up(connections: int | None = None) -> int:
+    """Open connections to the API ahead of the first request, so it does not pay for DNS and TLS.
+
+    Each connection sends one unauthenticated GET, whose answer does not matter, and then stays
+    in the keep-alive pool. Each attempt gives up after WARM_UP_TIMEOUT, and failures are logged
+    rather than raised. Returns the number of connections that were opened.
+    """
+    base_url = str(shared_openai_client().base_url)
+    count = connections or int(os.getenv("OPENAI_WARM_CONNECTIONS", DEFAULT_WARM_CONNECTIONS))
+    # With HTTP/2 all requests share one connection
+    count = 1 if _http2_enabled() else count
+
+    async def open_connection() -> bool:
+        try:
+            await shared_http_client().get(base_url, timeout=WARM_UP_TIMEOUT)
+            return True
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not warm up a connection to {base_url}: {e!r}")
+            return False
+
+    return sum(await asyncio.gather(*[open_connection() for _ in range(max(count, 0))]))
+
+
+async def close_shared_client():
+    """Close the pooled connections at shutdown. Services built on the client cannot be used after this."""
+    if shared_http_client.cache_info().currsize:
+        await shared_http_client().aclose()
+
+
+@asynccontextmanager
+async def openai_lifespan(app):
+    """Starlette lifespan that warms the shared client at server start and closes it at shutdown."""
+    await warm_up()
+    yield
+    await close_shared_client()
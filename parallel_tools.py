@@ -0,0 +1,95 @@
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+from semantic_kernel import Kernel
+from semantic_kernel.contents import FunctionCallContent
+from semantic_kernel.filters import AutoFunctionInvocationContext, FilterTypes
+
+DEFAULT_TOOL_CALL_CONCURRENCY = 4
+
+
+class _ToolCallBatch:
+    """Bookkeeping for the tool calls requested by a single model response."""
+
+    def __init__(self, max_concurrency: int):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.finished: dict[int, asyncio.Event] = {}
+        self.active = 0
+
+
+class ParallelToolCalls:
+    """Auto function invocation filter that runs the tool calls of one model response as a bounded batch.
+
+    Semantic Kernel already starts every function call of a response together, but without a limit,
+    and it appends the results to the chat history in completion order. This filter caps how many
+    calls of a batch execute at once and releases the results in the order the model requested them,
+    so the next request sees the same history regardless of which call finished first.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_TOOL_CALL_CONCURRENCY, ordered: bool = True):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.ordered = ordered
+        self._batches: dict[tuple[int, int], _ToolCallBatch] = {}
+
+    async def __call__(
+        self,
+        context: AutoFunctionInvocationContext,
+        next: Callable[[AutoFunctionInvocationContext], Awaitable[None]],
+    ):
+        key = (id(context.chat_history), context.request_sequence_index)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _ToolCallBatch(self.max_concurrency)
+        position = self._position(context)
+        finished = asyncio.Event()
+        if position is not None:
+            batch.finished[position] = finished
+        batch.active += 1
+
+        try:
+            # Give the sibling calls of this response a chance to register before any of them completes
+            await asyncio.sleep(0)
+
+            async with batch.semaphore:
+                await next(context)
+
+            if self.ordered and position is not None:
+                for earlier, event in sorted(batch.finished.items()):
+                    if earlier >= position:
+                        break
+                    await event.wait()
+        finally:
+            # The kernel appends the result to the chat history right after the filter returns,
+            # before the next call in line gets to run
+            finished.set()
+            batch.active -= 1
+            if batch.active == 0:
+                self._batches.pop(key, None)
+
+    @staticmethod
+    def _position(context: AutoFunctionInvocationContext) -> int | None:
+        """Index of the call among the function calls of the assistant message that requested it."""
+        call = context.function_call_content
+        if call is None or context.chat_history is None:
+            return None
+        for message in reversed(context.chat_history.messages):
+            calls = [item for item in message.items if isinstance(item, FunctionCallContent)]
+            for index, item in enumerate(calls):
+                if item.id == call.id:
+                    return index
+        return None
+
+
+def enable_parallel_tool_calls(kernel: Kernel, max_concurrency: int | None = None) -> ParallelToolCalls:
+    """Register a ParallelToolCalls filter on the kernel.
+
+    The limit defaults to the TOOL_CALL_CONCURRENCY environment variable.
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("TOOL_CALL_CONCURRENCY", DEFAULT_TOOL_CALL_CONCURRENCY))
+    tool_calls = ParallelToolCalls(max_concurrency=max_concurrency)
+    kernel.add_filter(FilterTypes.AUTO_FUNCTION_INVOCATION, tool_calls)
+    return tool_calls
@@ -0,0 +1,439 @@
+import logging
+import os
+from typing import Annotated, Any
+
+import numpy as np
+from semantic_kernel.functions import kernel_function
+
+from columnar_cache import ColumnarDataset, DictionaryColumn, open_csv
+from spatial_index import GridIndex
+
+logger = logging.getLogger(__name__)
+
+DATA_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIRECTORY = os.path.join(DATA_DIRECTORY, ".population_cache")
+
+# Overseas territories have their own iso3 (and code3), so they are matched to their country by name
+COUNTRY_JOIN_KEYS = ("iso3", "Country_Region")
+
+ADMIN1_CSV = os.path.join(DATA_DIRECTORY, "PopulationByAdmin1.csv")
+COUNTRY_CSV = os.path.join(DATA_DIRECTORY, "PouplationByCountry.csv")
+
+ADMIN1_SCHEMA = {
+    "UID": np.int64,
+    "iso2": np.str_,
+    "iso3": np.str_,
+    "code3": np.int32,
+    "Province_State": np.str_,
+    "Country_Region": np.str_,
+    "Lat": np.float64,
+    "Long": np.float64,
+    "Combined_Key": np.str_,
+    "Population": np.int64,
+}
+
+COUNTRY_SCHEMA = {
+    "UID": np.int64,
+    "iso2": np.str_,
+    "iso3": np.str_,
+    "code3": np.int32,
+    "Country_Region": np.str_,
+    "Lat": np.float64,
+    "Long": np.float64,
+    "Population": np.int64,
+}
+
+AGGREGATES = ("sum", "mean", "min", "max", "count")
+OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "contains")
+
+
+class Table:
+    """A dataset backed by the columnar cache.
+
+    Columns are memory-mapped the first time a query touches them, so memory scales with the
+    columns actually used. String columns stay dictionary-encoded; they are only decoded in
+    full when an operation needs the raw values.
+    """
+
+    def __init__(self, name: str, dataset: ColumnarDataset):
+        self.name = name
+        self.dataset = dataset
+        self._decoded: dict[str, np.ndarray] = {}
+        self._groups: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._spatial_index: GridIndex | None = None
+
+    def __len__(self) -> int:
+        return self.dataset.rows
+
+    @property
+    def columns(self) -> list[str]:
+        return self.dataset.column_names
+
+    def _check(self, name: str):
+        if name not in self.dataset.column_names:
+            raise ValueError(f"Unknown column {name!r} in {self.name}, expected one of {', '.join(self.columns)}")
+
+    def encoded(self, name: str) -> DictionaryColumn | None:
+        """The dictionary-encoded form of a string column, or None for numeric columns."""
+        self._check(name)
+        return self.dataset.column(name) if self.dataset.is_dictionary(name) else None
+
+    def check_numeric(self, name: str):
+        """Raise a ValueError naming the numeric columns when `name` is a string column."""
+        self._check(name)
+        if self.dataset.is_dictionary(name):
+            numeric = [column for column in self.columns if not self.dataset.is_dictionary(column)]
+            raise ValueError(f"Column {name!r} in {self.name} is not numeric; numeric columns are {', '.join(numeric)}")
+
+    def column(self, name: str) -> np.ndarray:
+        self._check(name)
+        column = self.dataset.column(name)
+        if not isinstance(column, DictionaryColumn):
+            return column
+        if name not in self._decoded:
+            self._decoded[name] = column.decode()
+        return self._decoded[name]
+
+    def groups(self, by: str) -> tuple[np.ndarray, np.ndarray]:
+        """Distinct values of a column and the group index of every row, computed once per column."""
+        if by not in self._groups:
+            encoded = self.encoded(by)
+            if encoded is not None:
+                # The sorted dictionary and its codes already are the distinct values and group indices
+                self._groups[by] = (encoded.dictionary, encoded.codes)
+            else:
+                self._groups[by] = np.unique(self.column(by), return_inverse=True)
+        return self._groups[by]
+
+    def spatial_index(self) -> GridIndex:
+        """Grid index over the Lat/Long columns, built on first use."""
+        if self._spatial_index is None:
+            self._spatial_index = GridIndex(self.column("Lat"), self.column("Long"))
+        return self._spatial_index
+
+    def rows(self, indices: np.ndarray, columns: list[str] | None = None) -> list[dict[str, Any]]:
+        selected = {}
+        for name in columns or self.columns:
+            encoded = self.encoded(name)
+            selected[name] = encoded.decode(indices) if encoded is not None else self.column(name)[indices]
+        return [dict(zip(selected, values)) for values in zip(*(array.tolist() for array in selected.values()))]
+
+
+def load_table(name: str, path: str, schema: dict[str, type], cache_directory: str = CACHE_DIRECTORY) -> Table:
+    """Load a CSV into a Table through the columnar cache, ingesting it only when it changed."""
+    return Table(name, open_csv(path, schema, cache_directory, name))
+
+
+def _coerce(array: np.ndarray, value: str) -> Any:
+    if np.issubdtype(array.dtype, np.integer):
+        return int(float(value))
+    if np.issubdtype(array.dtype, np.floating):
+        return float(value)
+    return value
+
+
+def _compare(array: np.ndarray, operator: str, value: str) -> np.ndarray:
+    if operator == "contains":
+        return np.char.find(np.char.lower(array.astype(np.str_)), value.lower()) >= 0
+    value = _coerce(array, value)
+    if operator == "==":
+        if array.dtype.kind == "U":
+            return np.char.lower(array) == value.lower()
+        return array == value
+    if operator == "!=":
+        return array != value
+    if operator == "<":
+        return array < value
+    if operator == "<=":
+        return array <= value
+    if operator == ">":
+        return array > value
+    if operator == ">=":
+        return array >= value
+    raise ValueError(f"Unknown operator {operator!r}, expected one of {', '.join(OPERATORS)}")
+
+
+def filter_mask(table: Table, column: str, operator: str, value: str) -> np.ndarray:
+    encoded = table.encoded(column)
+    if encoded is not None:
+        # Test each distinct value once, then look the result up by code
+        if operator == "==":
+            return (encoded.folded() == value.lower())[encoded.codes]
+        if operator == "contains":
+            return (np.char.find(encoded.folded(), value.lower()) >= 0)[encoded.codes]
+        return _compare(encoded.dictionary, operator, value)[encoded.codes]
+    return _compare(table.column(column), operator, value)
+
+
+def group_aggregate(table: Table, by: str, column: str, aggregate: str) -> tuple[np.ndarray, np.ndarray]:
+    """Aggregate a numeric column per distinct value of `by`, returning (keys, values)."""
+    keys, inverse = table.groups(by)
+    values = table.column(column)
+    counts = np.bincount(inverse, minlength=len(keys))
+    if aggregate == "count":
+        return keys, counts
+    if aggregate == "sum" and np.issubdtype(values.dtype, np.integer):
+        # bincount sums in float64, which turns integer totals into floats
+        sums = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(sums, inverse, values)
+        return keys, sums
+    if aggregate in ("sum", "mean"):
+        sums = np.bincount(inverse, weights=values, minlength=len(keys))
+        return keys, sums if aggregate == "sum" else sums / np.maximum(counts, 1)
+    if aggregate in ("min", "max"):
+        # Every group has at least one row, so the first value of each group is a valid start
+        result = values[np.unique(inverse, return_index=True)[1]].copy()
+        (np.minimum if aggregate == "min" else np.maximum).at(result, inverse, values)
+        return keys, result
+    raise ValueError(f"Unknown aggregate {aggregate!r}, expected one of {', '.join(AGGREGATES)}")
+
+
+def aggregate_values(values: np.ndarray, aggregate: str) -> float:
+    if aggregate == "count":
+        return len(values)
+    if not len(values):
+        return 0
+    if aggregate == "sum":
+        return values.sum().item()
+    if aggregate == "mean":
+        return values.mean().item()
+    if aggregate == "min":
+        return values.min().item()
+    if aggregate == "max":
+        return values.max().item()
+    raise ValueError(f"Unknown aggregate {aggregate!r}, expected one of {', '.join(AGGREGATES)}")
+
+
+def top_k_indices(values: np.ndarray, k: int, ascending: bool = False) -> np.ndarray:
+    """Indices of the k smallest or largest values, in order, without sorting the whole column."""
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    keyed = values if ascending else -values
+    candidates = np.argpartition(keyed, k - 1)[:k]
+    return candidates[np.argsort(keyed[candidates], kind="stable")]
+
+
+def join_indices(left: np.ndarray, right: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Inner join on key columns with unique right keys, returning matching (left, right) row indices."""
+    order = np.argsort(right, kind="stable")
+    sorted_right = right[order]
+    positions = np.clip(np.searchsorted(sorted_right, left), 0, max(len(right) - 1, 0))
+    matched = sorted_right[positions] == left if len(right) else np.zeros(len(left), dtype=bool)
+    return np.nonzero(matched)[0], order[positions[matched]]
+
+
+def join_on_keys(left: Table, right: Table, keys: tuple[str, ...]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Join on each key in turn for the left rows the earlier keys did not match.
+
+    Returns the matching (left, right) row indices and the left rows that no key matched.
+    """
+    remaining = np.arange(len(left))
+    lefts, rights = [], []
+    for key in keys:
+        matched, right_rows = join_indices(np.asarray(left.column(key))[remaining], np.asarray(right.column(key)))
+        lefts.append(remaining[matched])
+        rights.append(right_rows)
+        remaining = np.delete(remaining, matched)
+    return np.concatenate(lefts), np.concatenate(rights), remaining
+
+
+class PopulationPlugin:
+    """Answers questions about the population datasets locally with vectorized NumPy operations.
+
+    Both CSVs are opened through the columnar cache. "admin1" has one row per province or state,
+    "country" has one row per country.
+    """
+
+    def __init__(
+        self,
+        admin1_path: str = ADMIN1_CSV,
+        country_path: str = COUNTRY_CSV,
+        cache_directory: str = CACHE_DIRECTORY,
+    ):
+        self.tables = {
+            "admin1": load_table("admin1", admin1_path, ADMIN1_SCHEMA, cache_directory),
+            "country": load_table("country", country_path, COUNTRY_SCHEMA, cache_directory),
+        }
+
+    def table(self, name: str) -> Table:
+        if name not in self.tables:
+            raise ValueError(f"Unknown table {name!r}, expected one of {', '.join(self.tables)}")
+        return self.tables[name]
+
+    @kernel_function(
+        name="filter_rows",
+        description="Returns the rows of a population table where a column matches a condition",
+    )
+    def filter_rows(
+        self,
+        table: Annotated[str, "admin1 (provinces/states) or country"],
+        column: Annotated[str, "Column to test, e.g. Country_Region, iso3, Population, Lat"],
+        operator: Annotated[str, "One of ==, !=, <, <=, >, >=, contains"],
+        value: Annotated[str, "Value to compare against"],
+        limit: Annotated[int, "Maximum number of rows to return"] = 20,
+    ) -> list[dict]:
+        data = self.table(table)
+        indices = np.nonzero(filter_mask(data, column, operator, value))[0][:limit]
+        return data.rows(indices)
+
+    @kernel_function(
+        name="group_by",
+        description="Aggregates a numeric column of a population table per distinct value of another column",
+    )
+    def group_by(
+        self,
+        table: Annotated[str, "admin1 (provinces/states) or country"],
+        by: Annotated[str, "Column to group by, e.g. Country_Region or iso3"],
+        column: Annotated[str, "Numeric column to aggregate"] = "Population",
+        aggregate: Annotated[str, "One of sum, mean, min, max, count"] = "sum",
+        limit: Annotated[int, "Maximum number of groups to return, largest first"] = 20,
+    ) -> list[dict]:
+        data = self.table(table)
+        if aggregate != "count":
+            data.check_numeric(column)
+        keys, values = group_aggregate(data, by, column, aggregate)
+        order = top_k_indices(values, limit)
+        return [{by: key, aggregate: value} for key, value in zip(keys[order].tolist(), values[order].tolist())]
+
+    @kernel_function(
+        name="top_k",
+        description="Returns the rows of a population table with the largest (or smallest) values of a column",
+    )
+    def top_k(
+        self,
+        table: Annotated[str, "admin1 (provinces/states) or country"],
+        column: Annotated[str, "Numeric column to rank by"] = "Population",
+        k: Annotated[int, "Number of rows to return"] = 10,
+        ascending: Annotated[bool, "Return the smallest values instead of the largest"] = False,
+        country: Annotated[str, "Only rank rows of this country (Country_Region), empty for all"] = "",
+    ) -> list[dict]:
+        data = self.table(table)
+        data.check_numeric(column)
+        candidates = np.arange(len(data))
+        if country:
+            candidates = np.nonzero(filter_mask(data, "Country_Region", "==", country))[0]
+        values = np.asarray(data.column(column))[candidates]
+        return data.rows(candidates[top_k_indices(values, k, ascending)])
+
+    @kernel_function(
+        name="aggregate",
+        description="Computes a single aggregate of a numeric column, optionally over the rows matching a condition",
+    )
+    def aggregate(
+        self,
+        table: Annotated[str, "admin1 (provinces/states) or country"],
+        column: Annotated[str, "Numeric column to aggregate"] = "Population",
+        aggregate: Annotated[str, "One of sum, mean, min, max, count"] = "sum",
+        filter_column: Annotated[str, "Column to filter on, empty for all rows"] = "",
+        filter_operator: Annotated[str, "One of ==, !=, <, <=, >, >=, contains"] = "==",
+        filter_value: Annotated[str, "Value to compare against"] = "",
+    ) -> dict:
+        data = self.table(table)
+        if aggregate != "count":
+            data.check_numeric(column)
+        values = np.asarray(data.column(column))
+        if filter_column:
+            values = values[filter_mask(data, filter_column, filter_operator, filter_value)]
+        return {"column": column, "aggregate": aggregate, "rows": len(values), "value": aggregate_values(values, aggregate)}
+
+    def locate(self, place: str = "", latitude: float | None = None, longitude: float | None = None) -> tuple[float, float]:
+        """Coordinates given directly, or of a province/state or country looked up by name."""
+        if latitude is not None and longitude is not None:
+            return latitude, longitude
+        for table, column in (("admin1", "Province_State"), ("admin1", "Combined_Key"), ("country", "Country_Region")):
+            data = self.tables[table]
+            matches = np.nonzero(filter_mask(data, column, "==", place))[0] if place else []
+            if len(matches):
+                return float(data.column("Lat")[matches[0]]), float(data.column("Long")[matches[0]])
+        raise ValueError(f"Unknown place {place!r}, pass latitude and longitude instead")
+
+    def _with_distances(self, data: Table, indices: np.ndarray, distances: np.ndarray) -> list[dict]:
+        rows = data.rows(indices)
+        for row, distance in zip(rows, distances.tolist()):
+            row["Distance_km"] = round(distance, 1)
+        return rows
+
+    @kernel_function(
+        name="nearest",
+        description="Returns the rows of a population table closest to a place or a latitude/longitude",
+    )
+    def nearest(
+        self,
+        table: Annotated[str, "admin1 (provinces/states) or country"] = "admin1",
+        place: Annotated[str, "Province/state or country to measure from, e.g. Brussels"] = "",
+        latitude: Annotated[float | None, "Latitude to measure from, instead of a place"] = None,
+        longitude: Annotated[float | None, "Longitude to measure from, instead of a place"] = None,
+        k: Annotated[int, "Number of rows to return"] = 10,
+    ) -> list[dict]:
+        data = self.table(table)
+        indices, distances = data.spatial_index().nearest(*self.locate(place, latitude, longitude), k)
+        return self._with_distances(data, indices, distances)
+
+    @kernel_function(
+        name="within_radius",
+        description="Returns the rows of a population table within a distance in kilometers of a place or a latitude/longitude",
+    )
+    def within_radius(
+        self,
+        radius_km: Annotated[float, "Search radius in kilometers"],
+        table: Annotated[str, "admin1 (provinces/states) or country"] = "admin1",
+        place: Annotated[str, "Province/state or country to measure from, e.g. Brussels"] = "",
+        latitude: Annotated[float | None, "Latitude to measure from, instead of a place"] = None,
+        longitude: Annotated[float | None, "Longitude to measure from, instead of a place"] = None,
+        limit: Annotated[int, "Maximum number of rows to return, nearest first"] = 50,
+    ) -> list[dict]:
+        data = self.table(table)
+        indices, distances = data.spatial_index().within_radius(*self.locate(place, latitude, longitude), radius_km)
+        return self._with_distances(data, indices[:limit], distances[:limit])
+
+    @kernel_function(
+        name="within_bounds",
+        description="Returns the rows of a population table inside a latitude/longitude bounding box",
+    )
+    def within_bounds(
+        self,
+        south: Annotated[float, "Minimum latitude"],
+        west: Annotated[float, "Minimum longitude (greater than east to cross the antimeridian)"],
+        north: Annotated[float, "Maximum latitude"],
+        east: Annotated[float, "Maximum longitude"],
+        table: Annotated[str, "admin1 (provinces/states) or country"] = "admin1",
+        limit: Annotated[int, "Maximum number of rows to return"] = 50,
+    ) -> list[dict]:
+        data = self.table(table)
+        return data.rows(data.spatial_index().within_bounds(south, west, north, east)[:limit])
+
+    @kernel_function(
+        name="province_share_of_country",
+        description=(
+            "Joins provinces/states with their country (on iso3, or on the country name for territories with their "
+            "own iso3) and returns each one's share of the country population"
+        ),
+    )
+    def province_share_of_country(
+        self,
+        country: Annotated[str, "Only include this country (Country_Region), empty for all"] = "",
+        k: Annotated[int, "Number of rows to return, largest share first"] = 10,
+    ) -> list[dict]:
+        admin1, countries = self.tables["admin1"], self.tables["country"]
+        left, right, unmatched = join_on_keys(admin1, countries, COUNTRY_JOIN_KEYS)
+        if country:
+            mask = filter_mask(admin1, "Country_Region", "==", country)
+            keep = mask[left]
+            left, right, unmatched = left[keep], right[keep], unmatched[mask[unmatched]]
+        if len(unmatched):
+            names = [row["Province_State"] for row in admin1.rows(unmatched[:5], ["Province_State"])]
+            logger.warning(f"{len(unmatched)} provinces/states match no country and are left out, e.g. {names}")
+        country_population = np.asarray(countries.column("Population"))[right]
+        share = np.divide(
+            np.asarray(admin1.column("Population"))[left],
+            country_population,
+            out=np.zeros(len(left)),
+            where=country_population > 0,
+        )
+        order = top_k_indices(share, k)
+        rows = admin1.rows(left[order], ["Province_State", "Country_Region", "iso3", "Population"])
+        for row, country_total, value in zip(rows, country_population[order].tolist(), share[order].tolist()):
+            row["Country_Population"] = country_total
+            row["Share"] = round(value, 6)
+        return rows
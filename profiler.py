@@ -0,0 +1,202 @@
+import asyncio
+import hmac
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_SLOW_CALLBACK = 0.1
+LAG_PROBE_INTERVAL = 0.01
+MAX_SECONDS = 300.0
+# Slowest callbacks kept in a report
+MAX_SLOW_CALLBACKS = 50
+
+
+class _SlowCallbacks(logging.Handler):
+    """Collects the "Executing <handle> took N seconds" warnings asyncio logs in debug mode."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.callbacks: list[tuple[float, str]] = []
+
+    def emit(self, record: logging.LogRecord):
+        if record.msg.startswith("Executing") and len(record.args or ()) == 2:
+            handle, seconds = record.args
+            self.callbacks.append((seconds, str(handle)))
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of every thread of the process at a fixed interval.
+
+    A background thread reads sys._current_frames(), so the profiled code is not instrumented
+    and pays only for the GIL the sampler takes for a moment per sample. Stacks are counted in
+    the collapsed format ("outer;inner count" per line) that flamegraph.pl, speedscope and
+    inferno read. Nothing runs outside of start()/stop().
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.samples = 0
+        self._labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _stack(self, thread_name: str, frame: FrameType | None) -> tuple[str, ...]:
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.append(thread_name)
+        return tuple(reversed(stack))
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                name = names.setdefault(ident, f"thread-{ident}")
+                self.stacks[self._stack(name, frame)] += 1
+            self.samples += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+
+async def _probe_loop_lag(interval: float, lags: list[float], stop: asyncio.Event):
+    """Record how late the event loop wakes up a task that sleeps for `interval`."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(max(loop.time() - start - interval, 0.0))
+
+
+def _summarize_lag(lags: list[float], slow_callback: float) -> dict:
+    if not lags:
+        return {"probes": 0}
+    ordered = sorted(lags)
+    return {
+        "probes": len(lags),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p99_ms": round(ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "over_slow_callback": sum(lag >= slow_callback for lag in lags),
+    }
+
+
+async def profile(
+    seconds: float, interval: float = DEFAULT_INTERVAL, slow_callback: float = DEFAULT_SLOW_CALLBACK
+) -> dict:
+    """Profile the running process for `seconds` and return the report.
+
+    Besides the stack samples, the report has the event loop's lag, measured by a probe task,
+    and the callbacks that held the loop for longer than `slow_callback` seconds. Those come
+    from asyncio's debug mode, which is switched on for the duration only, since it slows the
+    loop down.
+    """
+    loop = asyncio.get_running_loop()
+    profiler = SamplingProfiler(interval)
+    slow = _SlowCallbacks()
+    asyncio_logger = logging.getLogger("asyncio")
+    debug, slow_callback_duration = loop.get_debug(), loop.slow_callback_duration
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    asyncio_logger.addHandler(slow)
+    loop.set_debug(True)
+    loop.slow_callback_duration = slow_callback
+    probe = asyncio.create_task(_probe_loop_lag(LAG_PROBE_INTERVAL, lags, stop))
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        stop.set()
+        await probe
+        loop.set_debug(debug)
+        loop.slow_callback_duration = slow_callback_duration
+        asyncio_logger.removeHandler(slow)
+
+    slowest = sorted(slow.callbacks, reverse=True)[:MAX_SLOW_CALLBACKS]
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "interval_ms": interval * 1000,
+        "samples": profiler.samples,
+        "loop_lag": _summarize_lag(lags, slow_callback),
+        "slow_callbacks": [{"ms": round(seconds * 1000, 3), "callback": handle} for seconds, handle in slowest],
+        "collapsed": profiler.collapsed(),
+    }
+
+
+def profile_routes() -> list:
+    """Starlette routes for on-demand profiling, or none when PROFILING_TOKEN is not set.
+
+    POST /admin/profile?seconds=10 profiles the server for that long and answers with the
+    report as JSON, or with only the collapsed stacks for ?format=collapsed. Optional
+    parameters are interval_ms (sampling period) and slow_callback_ms. Requests must send
+    "Authorization: Bearer <PROFILING_TOKEN>". One profile runs at a time.
+    """
+    token = os.getenv("PROFILING_TOKEN")
+    if not token:
+        return []
+
+    from starlette.responses import JSONResponse, PlainTextResponse
+    from starlette.routing import Route
+
+    running = threading.Lock()
+
+    async def endpoint(request):
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        try:
+            seconds = float(request.query_params.get("seconds", 10))
+            interval = float(request.query_params.get("interval_ms", DEFAULT_INTERVAL * 1000)) / 1000
+            slow_callback = float(request.query_params.get("slow_callback_ms", DEFAULT_SLOW_CALLBACK * 1000)) / 1000
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if not 0 < seconds <= MAX_SECONDS or not 0.001 <= interval <= 1 or slow_callback <= 0:
+            return JSONResponse(
+                {"error": f"expected 0 < seconds <= {MAX_SECONDS:.0f}, 1 <= interval_ms <= 1000, slow_callback_ms > 0"},
+                status_code=400,
+            )
+        if not running.acquire(blocking=False):
+            return JSONResponse({"error": "a profile is already running"}, status_code=409)
+        try:
+            report = await profile(seconds, interval, slow_callback)
+        finally:
+            running.release()
+        if request.query_params.get("format") == "collapsed":
+            return PlainTextResponse(report["collapsed"])
+        return JSONResponse(report)
+
+    return [Route("/admin/profile", endpoint, methods=["POST"], name="profile")]
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Any
+
+from semantic_kernel.contents import ChatHistory, ChatMessageContent
+from semantic_kernel.contents.utils.author_role import AuthorRole
+
+
+def current_time() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def context_message(**values: Any) -> ChatMessageContent:
+    """A system message with the data that changes between requests, such as the time or device states.
+
+    Providers cache the longest prompt prefix they have seen before: the tool schemas, then the
+    messages in order. Keeping this data out of the instructions and sending it after them, next
+    to the user's message, leaves the prefix identical from one request to the next.
+    """
+    lines = [f"- {name.replace('_', ' ')}: {value}" for name, value in values.items()]
+    return ChatMessageContent(role=AuthorRole.SYSTEM, content="Current context:\n" + "\n".join(lines))
+
+
+def build_history(instructions: str, user_input: str, **context: Any) -> ChatHistory:
+    """A single-turn history laid out for prompt caching: static instructions, volatile context, user input."""
+    history = ChatHistory()
+    history.add_system_message(instructions)
+    if context:
+        history.add_message(context_message(**context))
+    history.add_user_message(user_input)
+    return history
@@ -0,0 +1,232 @@
+import asyncio
+import contextvars
+import functools
+import gc
+import importlib.util
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections.abc import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+from functools import lru_cache
+
+from a2a.server.apps import A2AStarletteApplication
+from semantic_kernel import Kernel
+from semantic_kernel.functions.kernel_function_from_method import KernelFunctionFromMethod
+
+from agent_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_THREADS = 8
+# A sync kernel function that once ran this long on the loop runs on the thread pool from then on
+DEFAULT_OFFLOAD_THRESHOLD_MS = 2.0
+# The loop stalling this long is reported as a blocking call, 0 turns the detector off
+DEFAULT_BLOCKING_THRESHOLD_MS = 100.0
+# Innermost frames of a blocked loop that are logged
+BLOCKED_STACK_FRAMES = 12
+
+OFFLOAD_MODES = ("auto", "always", "never")
+
+
+def _choose(setting: str, fast: str, fallback: str) -> str:
+    value = os.getenv(setting, "auto").strip().lower()
+    if value != "auto":
+        return value
+    return fast if importlib.util.find_spec(fast) is not None else fallback
+
+
+def loop_implementation() -> str:
+    """uvloop when it is installed (pip install uvloop), unless SERVER_LOOP says otherwise."""
+    return _choose("SERVER_LOOP", "uvloop", "asyncio")
+
+
+def http_implementation() -> str:
+    """httptools when it is installed (pip install httptools), unless SERVER_HTTP says otherwise."""
+    return _choose("SERVER_HTTP", "httptools", "h11")
+
+
+@lru_cache(maxsize=None)
+def sync_executor() -> ThreadPoolExecutor:
+    """The bounded thread pool (SERVER_SYNC_THREADS) for sync kernel functions and run_in_executor calls."""
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv("SERVER_SYNC_THREADS", DEFAULT_SYNC_THREADS)), thread_name_prefix="sync-function"
+    )
+
+
+class _OffloadedMethod:
+    """Runs a sync kernel function on the loop while it is quick, and on the thread pool once it is not.
+
+    Handing a call to a thread costs tens of microseconds, more than a function like
+    LightsPlugin.get_state takes, so in "auto" mode a function moves to the pool only after a
+    call took longer than the threshold. Semantic Kernel awaits the future the pool returns.
+    """
+
+    def __init__(self, method, name: str, mode: str, threshold: float):
+        self.method = method
+        self.name = name
+        self.threshold = threshold
+        self.offload = mode == "always"
+        functools.update_wrapper(self, method)
+
+    def __call__(self, **kwargs):
+        if self.offload:
+            metrics.increment("sync.offloaded", function=self.name)
+            call = functools.partial(contextvars.copy_context().run, self.method, **kwargs)
+            return asyncio.get_running_loop().run_in_executor(sync_executor(), call)
+
+        start = time.perf_counter()
+        result = self.method(**kwargs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= self.threshold:
+            logger.info(f"{self.name} took {elapsed * 1000:.1f} ms on the event loop, running it on the thread pool")
+            self.offload = True
+        return result
+
+
+def offload_sync_functions(kernel: Kernel) -> Kernel:
+    """Keep the sync kernel functions of every plugin from blocking the event loop.
+
+    SERVER_SYNC_OFFLOAD is "auto" (default: offload the functions seen to be slow), "always"
+    or "never". SERVER_OFFLOAD_THRESHOLD_MS sets what counts as slow.
+    """
+    mode = os.getenv("SERVER_SYNC_OFFLOAD", "auto").strip().lower()
+    if mode not in OFFLOAD_MODES:
+        raise ValueError(f"SERVER_SYNC_OFFLOAD must be one of {', '.join(OFFLOAD_MODES)}, got {mode!r}")
+    if mode == "never":
+        return kernel
+    threshold = float(os.getenv("SERVER_OFFLOAD_THRESHOLD_MS", DEFAULT_OFFLOAD_THRESHOLD_MS)) / 1000
+
+    for plugin in kernel.plugins.values():
+        for function in plugin.functions.values():
+            if not isinstance(function, KernelFunctionFromMethod) or isinstance(function.method, _OffloadedMethod):
+                continue
+            method = function.method
+            if inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method):
+                continue
+            function.method = _OffloadedMethod(method, function.fully_qualified_name, mode, threshold)
+    return kernel
+
+
+class BlockingDetector:
+    """Reports calls that hold the event loop for longer than a threshold, with what they were running.
+
+    A callback on the loop stamps a heartbeat several times per threshold. A watchdog thread
+    that finds the heartbeat older than the threshold logs the loop thread's current stack.
+    The heartbeat records the full stall in the `loop.blocked` histogram once the loop runs
+    again. Unlike asyncio's debug mode, nothing wraps the loop's own callbacks.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.interval = threshold / 4
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread = 0
+        self._beat = 0.0
+        self._reported = 0.0
+        self._handle: asyncio.TimerHandle | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+        self._watchdog = threading.Thread(target=self._watch, name="blocking-detector", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        stall = now - self._beat - self.interval
+        if stall >= self.threshold:
+            metrics.histogram("loop.blocked").record(int(stall * 1_000_000))
+            logger.warning(f"Event loop was blocked for {stall * 1000:.0f} ms")
+        self._beat = now
+        if not self._stop.is_set():
+            self._handle = self._loop.call_later(self.interval, self._heartbeat)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            # Report each stall once, while it is still going on
+            if time.monotonic() - beat - self.interval < self.threshold or self._reported == beat:
+                continue
+            self._reported = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame, limit=BLOCKED_STACK_FRAMES)) if frame else ""
+            logger.warning(f"Event loop blocked for more than {self.threshold * 1000:.0f} ms, running:\n{stack}")
+
+
+class TimedA2AStarletteApplication(A2AStarletteApplication):
+    """A2AStarletteApplication that records how long each JSON-RPC response takes to serialize.
+
+    `a2a.serialize` covers dumping the result model and encoding the JSON body. Streamed
+    responses are serialized event by event as they are sent, and are not timed.
+    """
+
+    def __init__(self, *args, agent: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.agent = agent
+
+    def _create_response(self, handler_result):
+        if isinstance(handler_result, AsyncGenerator):
+            return super()._create_response(handler_result)
+        with metrics.timer("a2a.serialize", agent=self.agent):
+            return super()._create_response(handler_result)
+
+
+def runtime_lifespan(inner=None):
+    """Starlette lifespan that sets up the server runtime around an optional inner lifespan.
+
+    The loop's default executor becomes the bounded sync pool, and a BlockingDetector watches
+    the loop when SERVER_BLOCKING_THRESHOLD_MS is above 0. Once started, the objects loaded so
+    far are moved out of the garbage collector's reach with gc.freeze(): the kernels, models and
+    modules live as long as the process, and walking them made each full collection stall the
+    loop for hundreds of milliseconds.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app):
+        asyncio.get_running_loop().set_default_executor(sync_executor())
+        threshold = float(os.getenv("SERVER_BLOCKING_THRESHOLD_MS", DEFAULT_BLOCKING_THRESHOLD_MS)) / 1000
+        detector = BlockingDetector(threshold) if threshold > 0 else None
+        async with inner(app) if inner is not None else nullcontext():
+            gc.collect()
+            gc.freeze()
+            if detector is not None:
+                detector.start()
+            try:
+                yield
+            finally:
+                if detector is not None:
+                    detector.stop()
+
+    return lifespan
+
+
+def run_server(app, host: str, port: int):
+    """Serve an ASGI app with uvicorn on the fastest available event loop and HTTP parser.
+
+    The access log, one line per request, is off unless SERVER_ACCESS_LOG is set.
+    """
+    import uvicorn
+
+    loop, http = loop_implementation(), http_implementation()
+    access_log = os.getenv("SERVER_ACCESS_LOG", "").lower() in ("1", "true", "yes")
+    print(f"Serving on {host}:{port} with the {loop} event loop and the {http} HTTP parser")
+    uvicorn.run(app, host=host, port=port, loop=loop, http=http, access_log=access_log)
@@ -0,0 +1,97 @@
+import asyncio
+import functools
+import inspect
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+
+@dataclass
+class SingleFlightStats:
+    """Counters for a single-flight group."""
+
+    calls: int = 0
+    executions: int = 0
+    coalesced: int = 0
+    errors: int = 0
+
+    @property
+    def coalesced_ratio(self) -> float:
+        return self.coalesced / self.calls if self.calls else 0.0
+
+
+class SingleFlight:
+    """Shares one in-flight execution between concurrent callers that use the same key.
+
+    The first caller for a key starts the work as a task, later callers with the same key
+    await that task instead of starting their own. Once the task finishes the key is released,
+    so the next call starts a fresh execution (this is coalescing, not caching).
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.stats = SingleFlightStats()
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) once for all concurrent callers of key and return its result."""
+        self.stats.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats.executions += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._release, key))
+        else:
+            self.stats.coalesced += 1
+
+        # Shield the shared task so a cancelled caller does not cancel it for everyone else
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved, every waiter may have been cancelled already
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.errors += 1
+
+
+def _call_key(fn: Callable, sig: inspect.Signature, args: tuple, kwargs: dict) -> Hashable:
+    bound = sig.bind(*args, **kwargs)
+    bound.apply_defaults()
+    key = [fn.__qualname__]
+    for name, value in bound.arguments.items():
+        if name == "self":
+            # Different plugin instances may carry different settings (e.g. tokens)
+            value = id(value)
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+        key.append((name, value))
+    return tuple(key)
+
+
+def single_flight(group: SingleFlight | None = None):
+    """Decorator that coalesces concurrent identical calls to an async (kernel) function.
+
+    Place it directly above the function definition, below `@kernel_function`, so the kernel
+    still sees the original signature. Calls are identical when they go to the same plugin
+    instance with the same bound arguments. All coalesced callers receive the same result object.
+    """
+    flights = group if group is not None else SingleFlight()
+
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        if not inspect.iscoroutinefunction(fn):
+            raise TypeError(f"single_flight requires an async function, got {fn.__qualname__}")
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await flights.do(_call_key(fn, sig, args, kwargs), fn, *args, **kwargs)
+
+        wrapper.single_flight = flights
+        return wrapper
+
+    return decorator
@@ -0,0 +1,141 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Below this many points one vectorized scan is cheaper than walking grid cells
+SCAN_ROWS = 4096
+
+
+def haversine_km(lat: float | np.ndarray, lon: float | np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in kilometers from one point (or matching points) to every point in lats/lons."""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, end) for every pair, without a Python loop."""
+    lengths = ends - starts
+    total = lengths.sum()
+    if not total:
+        return np.empty(0, dtype=np.intp)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+class GridIndex:
+    """Equirectangular grid over latitude/longitude for radius, nearest and bounding box queries.
+
+    Rows are sorted by grid cell so the points of any set of cells are a few contiguous slices.
+    A query only computes exact haversine distances for the points in the cells that can
+    contain matches. Small tables (up to SCAN_ROWS points) are scanned in full instead. Rows
+    without coordinates (NaN) are left out of the index.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_degrees: float = 1.0):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+        self.rows = math.ceil(180 / cell_degrees)
+        self.cols = math.ceil(360 / cell_degrees)
+        self.size = len(lat)
+
+        valid = np.nonzero(~(np.isnan(lat) | np.isnan(lon)))[0]
+        cell_ids = self._cell_row(lat[valid]) * self.cols + self._cell_col(lon[valid])
+        order = np.argsort(cell_ids, kind="stable")
+        # Row numbers in the original table, plus contiguous coordinates in cell order
+        self.order = valid[order]
+        self.lat = lat[self.order]
+        self.lon = lon[self.order]
+        self.cells, self.starts, counts = np.unique(cell_ids[order], return_index=True, return_counts=True)
+        self.ends = self.starts + counts
+
+    def _cell_row(self, lat: np.ndarray) -> np.ndarray:
+        return np.clip(((lat + 90) // self.cell_degrees).astype(np.int64), 0, self.rows - 1)
+
+    def _cell_col(self, lon: np.ndarray) -> np.ndarray:
+        return (((lon + 180) % 360) // self.cell_degrees).astype(np.int64) % self.cols
+
+    def _candidates(self, row_range: tuple[int, int], col_ranges: list[tuple[int, int]]) -> np.ndarray:
+        """Positions (in cell order) of the points in the given rows and column ranges of the grid."""
+        rows = np.arange(row_range[0], row_range[1] + 1)
+        cols = np.concatenate([np.arange(first, last + 1) for first, last in col_ranges])
+        wanted = (rows[:, None] * self.cols + cols[None, :]).ravel()
+        found = np.minimum(np.searchsorted(self.cells, wanted), len(self.cells) - 1)
+        found = found[self.cells[found] == wanted]
+        return _ranges(self.starts[found], self.ends[found])
+
+    def _column_ranges(self, west: float, east: float) -> list[tuple[int, int]]:
+        if east - west >= 360 - self.cell_degrees:
+            # Both ends may fall in the same cell, so treat nearly full spans as the whole circle
+            return [(0, self.cols - 1)]
+        first, last = int(self._cell_col(np.array([west]))[0]), int(self._cell_col(np.array([east]))[0])
+        if first <= last:
+            return [(first, last)]
+        # The range crosses the antimeridian
+        return [(first, self.cols - 1), (0, last)]
+
+    def _radius_candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        if len(self.order) <= SCAN_ROWS:
+            return np.arange(len(self.order))
+        delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+        if north >= 90 or south <= -90 or delta_lat >= 90:
+            col_ranges = [(0, self.cols - 1)]
+        else:
+            # Longitude span of the circle at its widest latitude
+            widest = max(abs(south), abs(north))
+            delta_lon = min(delta_lat / math.cos(math.radians(widest)), 180.0)
+            col_ranges = self._column_ranges(lon - delta_lon, lon + delta_lon)
+        row_range = (int(self._cell_row(np.array([south]))[0]), int(self._cell_row(np.array([north]))[0]))
+        return self._candidates(row_range, col_ranges)
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> tuple[np.ndarray, np.ndarray]:
+        """Table rows within radius_km of a point and their distances, nearest first."""
+        candidates = self._radius_candidates(lat, lon, radius_km)
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.order[candidates[order]], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """The k table rows closest to a point and their distances, nearest first."""
+        k = min(k, len(self.order))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # Grow the search radius until it holds k points; anything outside it is farther than all of them
+        radius_km = math.radians(self.cell_degrees) * EARTH_RADIUS_KM
+        while radius_km < math.pi * EARTH_RADIUS_KM and len(self.order) > SCAN_ROWS:
+            candidates = self._radius_candidates(lat, lon, radius_km)
+            if len(candidates) >= k:
+                distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+                inside = np.count_nonzero(distances <= radius_km)
+                if inside >= k:
+                    break
+            radius_km *= 2
+        else:
+            candidates = np.arange(len(self.order))
+            distances = haversine_km(lat, lon, self.lat, self.lon)
+
+        closest = np.argpartition(distances, k - 1)[:k]
+        closest = closest[np.argsort(distances[closest], kind="stable")]
+        return self.order[candidates[closest]], distances[closest]
+
+    def within_bounds(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Table rows inside a latitude/longitude box. A box with west > east crosses the antimeridian."""
+        if south > north:
+            return np.empty(0, dtype=np.intp)
+        crosses = west > east
+        if len(self.order) <= SCAN_ROWS:
+            candidates = np.arange(len(self.order))
+        else:
+            row_range = (int(self._cell_row(np.array([south]))[0]), int(self._cell_row(np.array([north]))[0]))
+            candidates = self._candidates(row_range, self._column_ranges(west, east + 360 if crosses else east))
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside_lon = (lon >= west) | (lon <= east) if crosses else (lon >= west) & (lon <= east)
+        inside = inside_lon & (lat >= south) & (lat <= north)
+        return np.sort(self.order[candidates[inside]])
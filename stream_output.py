@@ -0,0 +1,217 @@
+import asyncio
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, TextIO
+
+from semantic_kernel.contents import StreamingFileReferenceContent
+
+from agent_metrics import metrics
+
+DEFAULT_FLUSH_BYTES = 4096
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+
+@dataclass
+class StreamStats:
+    chunks: int = 0
+    chars: int = 0
+    first_chunk_s: float | None = None
+    elapsed_s: float = 0.0
+
+    @property
+    def chars_per_second(self) -> float:
+        streaming = self.elapsed_s - (self.first_chunk_s or 0.0)
+        return self.chars / streaming if streaming > 0 else 0.0
+
+    def describe(self) -> str:
+        first = f"{self.first_chunk_s * 1000:.0f} ms" if self.first_chunk_s is not None else "n/a"
+        return f"first chunk {first}, {self.chars} chars in {self.elapsed_s:.2f} s ({self.chars_per_second:.0f} chars/s)"
+
+
+class OutputSink:
+    """Receives a response stream as segments, i.e. runs of text or code from the same role."""
+
+    def begin_segment(self, kind: str, role: str | None):
+        pass
+
+    def write(self, text: str):
+        pass
+
+    def end_segment(self, kind: str):
+        pass
+
+    def file(self, file_id: str):
+        pass
+
+    def close(self, stats: StreamStats):
+        pass
+
+
+class TerminalSink(OutputSink):
+    """Renders segments to a terminal, buffering chunks and flushing by size or age.
+
+    Buffered text is written once it reaches flush_bytes or is flush_interval old. Inside an
+    event loop a timer also flushes it, so output is never held back while the stream pauses.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        flush_bytes: int = DEFAULT_FLUSH_BYTES,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        show_stats: bool = True,
+    ):
+        self.stream = stream or sys.stdout
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.show_stats = show_stats
+        self._buffer: list[str] = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._last_role: str | None = None
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _append(self, text: str):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        elif self._timer is None:
+            try:
+                self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+            except RuntimeError:
+                pass
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+    def begin_segment(self, kind: str, role: str | None):
+        if kind == "code":
+            self._append("\n\n```python\n")
+            return
+        if role is not None and role != self._last_role:
+            self._append(f"\n# {role}: ")
+            self._last_role = role
+
+    def write(self, text: str):
+        self._append(text)
+
+    def end_segment(self, kind: str):
+        if kind == "code":
+            self._append("\n```\n")
+            # Code output is followed by a fresh role header
+            self._last_role = None
+
+    def close(self, stats: StreamStats):
+        self._append("\n")
+        if self.show_stats and stats.chunks:
+            self._append(f"[{stats.describe()}]\n")
+        self.flush()
+
+
+class JsonlSink(OutputSink):
+    """Writes one JSON object per segment, file and stream summary, for tooling and replay."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._segment: dict[str, Any] | None = None
+        self._parts: list[str] = []
+        self._start = time.perf_counter()
+
+    def _emit(self, record: dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _offset_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 1)
+
+    def begin_segment(self, kind: str, role: str | None):
+        role = getattr(role, "value", role)
+        self._segment = {"type": "segment", "kind": kind, "role": role, "start_ms": self._offset_ms()}
+        self._parts = []
+
+    def write(self, text: str):
+        self._parts.append(text)
+
+    def end_segment(self, kind: str):
+        if self._segment is not None:
+            self._emit({**self._segment, "end_ms": self._offset_ms(), "text": "".join(self._parts)})
+            self._segment = None
+
+    def file(self, file_id: str):
+        self._emit({"type": "file", "file_id": file_id, "at_ms": self._offset_ms()})
+
+    def close(self, stats: StreamStats):
+        self._emit({"type": "stats", **asdict(stats), "chars_per_second": round(stats.chars_per_second, 1)})
+        self._file.close()
+
+
+class StreamRenderer:
+    """Splits an agent response stream into segments and fans them out to sinks.
+
+    Segment boundaries (code vs. text, role changes) are detected once per chunk and turned
+    into begin/end calls, so sinks only deal with whole segments and plain text. Time to
+    first chunk and throughput are recorded in the metrics registry under `stream.*`.
+    """
+
+    def __init__(self, sinks: list[OutputSink], agent: str = "interpreter"):
+        self.sinks = sinks
+        self.agent = agent
+        self.stats = StreamStats()
+        self.file_ids: list[str] = []
+        self._segment: tuple[str, Any] | None = None
+        self._start = time.perf_counter()
+
+    def feed(self, response):
+        kind = "code" if response.metadata.get("code", False) else "text"
+        role = getattr(response, "role", None)
+
+        segment = (kind, role if kind == "text" else None)
+        if segment != self._segment:
+            # A text chunk without a role continues the current text segment
+            if not (kind == "text" and role is None and self._segment and self._segment[0] == "text"):
+                self._end_segment()
+                self._segment = segment
+                for sink in self.sinks:
+                    sink.begin_segment(kind, role)
+
+        text = response.content
+        if text:
+            if self.stats.first_chunk_s is None:
+                self.stats.first_chunk_s = time.perf_counter() - self._start
+                metrics.histogram("stream.first_chunk", agent=self.agent).record(self.stats.first_chunk_s * 1e6)
+            self.stats.chunks += 1
+            self.stats.chars += len(text)
+            for sink in self.sinks:
+                sink.write(text)
+
+        for item in response.items:
+            if isinstance(item, StreamingFileReferenceContent):
+                self.file_ids.append(item.file_id)
+                for sink in self.sinks:
+                    sink.file(item.file_id)
+
+    def _end_segment(self):
+        if self._segment is not None:
+            for sink in self.sinks:
+                sink.end_segment(self._segment[0])
+            self._segment = None
+
+    def close(self) -> StreamStats:
+        self._end_segment()
+        self.stats.elapsed_s = time.perf_counter() - self._start
+        metrics.histogram("stream.total", agent=self.agent).record(self.stats.elapsed_s * 1e6)
+        metrics.increment("stream.chars", self.stats.chars, agent=self.agent)
+        for sink in self.sinks:
+            sink.close(self.stats)
+        return self.stats
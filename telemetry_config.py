@@ -0,0 +1,108 @@
+import os
+
+from ioa_observe.sdk import Observe
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+
+TELEMETRY_MODES = ("off", "sampled", "full")
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_QUEUE_SIZE = 2048
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_EXPORT_DELAY_MS = 5000
+DEFAULT_EXPORT_TIMEOUT_MS = 10000
+
+
+class SampledSpanProcessor(SpanProcessor):
+    """Forwards only a fixed ratio of traces to the wrapped processor.
+
+    The Observe decorators expect every span to be recording, so sampling cannot happen in the
+    tracer provider. Instead every span is recorded and whole traces are dropped before export,
+    using the same trace id rule as TraceIdRatioBased.
+    """
+
+    def __init__(self, delegate: SpanProcessor, rate: float):
+        self.delegate = delegate
+        self.bound = TraceIdRatioBased.get_bound_for_rate(rate)
+
+    def _sampled(self, span: ReadableSpan) -> bool:
+        return span.context is not None and span.context.trace_id & TraceIdRatioBased.TRACE_ID_LIMIT < self.bound
+
+    def on_start(self, span: Span, parent_context: Context | None = None):
+        if self._sampled(span):
+            self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        if self._sampled(span):
+            self.delegate.on_end(span)
+
+    def shutdown(self):
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+def telemetry_mode(api_endpoint: str | None = None) -> str:
+    """Resolve the telemetry mode from TELEMETRY_MODE.
+
+    Without an explicit mode, telemetry is "full" when an OTLP endpoint is configured and "off" otherwise.
+    """
+    mode = (os.getenv("TELEMETRY_MODE") or "").strip().lower()
+    if not mode:
+        return "full" if api_endpoint else "off"
+    if mode not in TELEMETRY_MODES:
+        raise ValueError(f"TELEMETRY_MODE must be one of {', '.join(TELEMETRY_MODES)}, got {mode!r}")
+    return mode
+
+
+def init_telemetry(
+    app_name: str,
+    api_endpoint: str | None = None,
+    mode: str | None = None,
+    exporter: SpanExporter | None = None,
+    instrument_a2a: bool = False,
+) -> str:
+    """Initialize the Observe SDK so span export never runs on the request path.
+
+    Spans are handed to a BatchSpanProcessor, which exports them from a background thread. Its
+    queue is bounded (TELEMETRY_QUEUE_SIZE) and drops new spans when full instead of blocking the
+    caller. In "sampled" mode only TELEMETRY_SAMPLE_RATE of the traces are exported, and in "off"
+    mode the `@agent`/`@tool`/`@graph` decorators call straight through to the wrapped function.
+    With instrument_a2a, the A2A client and server are instrumented too (not in "off" mode, where
+    the instrumentor has no tracer to use). Returns the mode that was applied.
+    """
+    api_endpoint = api_endpoint if api_endpoint is not None else os.getenv("OTLP_HTTP_ENDPOINT")
+    mode = mode or telemetry_mode(api_endpoint)
+    if mode not in TELEMETRY_MODES:
+        raise ValueError(f"Telemetry mode must be one of {', '.join(TELEMETRY_MODES)}, got {mode!r}")
+
+    if mode == "off" or not api_endpoint:
+        # The SDK cannot export anywhere without an endpoint, so run the decorators as pass-throughs
+        Observe.init(app_name, enabled=False)
+        return "off"
+
+    if exporter is None:
+        from ioa_observe.sdk.tracing.tracing import init_spans_exporter
+
+        exporter = init_spans_exporter(api_endpoint, {})
+
+    processor = BatchSpanProcessor(
+        exporter,
+        max_queue_size=int(os.getenv("TELEMETRY_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+        max_export_batch_size=int(os.getenv("TELEMETRY_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+        schedule_delay_millis=float(os.getenv("TELEMETRY_EXPORT_DELAY_MS", DEFAULT_EXPORT_DELAY_MS)),
+        export_timeout_millis=float(os.getenv("TELEMETRY_EXPORT_TIMEOUT_MS", DEFAULT_EXPORT_TIMEOUT_MS)),
+    )
+    if mode == "sampled":
+        processor = SampledSpanProcessor(processor, float(os.getenv("TELEMETRY_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)))
+
+    Observe.init(app_name, api_endpoint=api_endpoint, processor=processor)
+
+    if instrument_a2a:
+        from ioa_observe.sdk.instrumentations.a2a import A2AInstrumentor
+
+        A2AInstrumentor().instrument()
+    return mode